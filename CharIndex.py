@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+Radical/stroke count => chars index
+
+All chars are numbered hottest first (ranked by allFreq, unranked ones last), so a
+row is also a frequency order. The index keeps for every radical (raw_js["radicals"])
+and every stroke count (raw_js["strokes"]) the sorted array of its rows:
+
+    radical "口"  => array [rows of 口 chars]
+    strokes 5     => array [rows of 5 stroke chars]
+
+A query intersects these instead of looking at ChChar objects: a freq_limit is a
+bisect on the ranks of the rows (they are ascending), a radical picks one array and
+is filtered by the stroke counts of its rows, a stroke range merges the arrays of
+its counts. The result comes out hottest first without sorting.
+
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+
+class CharIndex:
+    def __init__(self):
+        self.chars = "" #all chars, hottest first
+        self.freqs = array("i") #allFreq rank of each row, 0 if unranked
+        self.strokes = array("H") #stroke count of each row, 0 if unknown
+        self.ranked = 0 #rows with a rank, they come first
+        self.byRadical = {} #radical => array of rows
+        self.byStrokes = {} #stroke count => array of rows
+        return
+
+    @staticmethod
+    def fromDict(md):
+        """ index all chars of a built MultiChineseDict """
+        index = CharIndex()
+        ccs = sorted(md.allChars.values(), key=lambda cc: (cc.freq == 0, cc.freq))
+        index.chars = "".join(cc.char for cc in ccs)
+        for row, cc in enumerate(ccs):
+            try:
+                strokes = int(cc.raw_js.get("strokes") or 0)
+            except ValueError:
+                strokes = 0
+            index.freqs.append(cc.freq)
+            index.strokes.append(strokes)
+            if cc.freq > 0:
+                index.ranked += 1
+            radical = cc.raw_js.get("radicals")
+            if radical:
+                index.byRadical.setdefault(radical, array("i")).append(row)
+            if strokes:
+                index.byStrokes.setdefault(strokes, array("i")).append(row)
+        return index
+
+    @staticmethod
+    def strokeRange(strokes):
+        """ (min, max) of strokes, given as a count, a (min, max) pair or "5-8" """
+        if isinstance(strokes, str):
+            lo, dummy, hi = strokes.partition("-")
+            return int(lo), int(hi or lo)
+        if isinstance(strokes, int):
+            return strokes, strokes
+        return tuple(strokes)
+
+    def find(self, radical=None, strokes=None, freq_limit=None):
+        """
+        chars with radical and strokes (see strokeRange()), ranked within freq_limit
+        if given, hottest first. None leaves a filter out.
+        """
+        end = len(self.chars)
+        if freq_limit:
+            end = bisect_right(self.freqs, freq_limit, 0, self.ranked)
+        if strokes is not None:
+            lo, hi = CharIndex.strokeRange(strokes)
+
+        if radical is not None:
+            rows = self.byRadical.get(radical, ())
+            rows = rows[:bisect_left(rows, end)]
+            if strokes is not None:
+                rows = [r for r in rows if lo <= self.strokes[r] <= hi]
+        elif strokes is not None:
+            rows = heapq.merge(*(rows[:bisect_left(rows, end)]
+                                 for n, rows in self.byStrokes.items() if lo <= n <= hi))
+        else:
+            rows = range(end)
+        return [self.chars[r] for r in rows]
+
+    def page(self, radical=None, strokes=None, freq_limit=None, page=0, page_size=20):
+        """ (total, chars of page page) of find() """
+        chars = self.find(radical, strokes, freq_limit)
+        return len(chars), chars[page*page_size:(page+1)*page_size]
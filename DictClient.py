@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+Client of the dictionary daemon (dict_server.py)
+
+The daemon keeps MultiChineseDict and jieba loaded and answers JSON-lines requests
+on a Unix domain socket. One request per line:
+
+    {"op": "lookup", "key": "天"}
+
+and one response per line:
+
+    {"ok": true, "result": ...}
+    {"ok": false, "error": "not_found", "message": "天天天"}
+
+ops: ping, lookup, lookup_many, segment, related, prefix, pinyin, chars, xiehouyu. See
+dict_server.DictService for their parameters.
+
+connectDictServer() returns None when no daemon is running, so tools can fall back
+to loading the dictionary in process.
+
+"""
+
+import os
+import json
+import socket
+import logging
+from MultiChineseDict import CACHE_DIR, entryFromDict
+
+SOCKET_FILE="%s/dict_server.sock"%CACHE_DIR
+
+class DictServerError(Exception):
+    pass
+
+class DictClient:
+    def __init__(self, sock):
+        self.sock = sock
+        self.fp = sock.makefile("rwb")
+        return
+
+    def close(self):
+        self.fp.close()
+        self.sock.close()
+
+    def call(self, op, **params):
+        params["op"] = op
+        self.fp.write(json.dumps(params, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.fp.flush()
+        line = self.fp.readline()
+        if not line:
+            raise DictServerError("dictionary daemon closed the connection")
+        response = json.loads(line)
+        if response["ok"]:
+            return response["result"]
+        if response["error"] == "not_found":
+            raise KeyError(response["message"])
+        raise DictServerError(response["message"])
+
+    def lookup(self, s):
+        """ same contract as MultiChineseDict.lookup() """
+        return entryFromDict(self.call("lookup", key=s))
+
+    def lookup_many(self, keys):
+        """ same contract as MultiChineseDict.lookup_many() """
+        keys = list(keys)
+        return [(s, entryFromDict(d) if d else None)
+                for s, d in zip(keys, self.call("lookup_many", keys=keys))]
+
+    def segment(self, text, cut_all=False):
+        """ jieba.cut() of the daemon, as a list """
+        return self.call("segment", text=text, cut_all=cut_all)
+
+    def related(self, ch, n=None, freq_limit=None):
+        """ ([(word, freq)], [(idiom, freq)]) hottest first, see MultiChineseDict.relatedWords() """
+        r = self.call("related", key=ch, n=n, freq_limit=freq_limit)
+        return r["words"], r["idioms"]
+
+    def prefix(self, prefix, n=20):
+        return self.call("prefix", key=prefix, n=n)
+
+    def pinyin(self, pinyin, page=0, page_size=20):
+        """ (total, headwords of the page) """
+        r = self.call("pinyin", key=pinyin, page=page, page_size=page_size)
+        return r["total"], r["words"]
+
+    def chars(self, radical=None, strokes=None, freq_limit=None, page=0, page_size=20):
+        """ (total, chars of the page), see MultiChineseDict.lookupChars() """
+        r = self.call("chars", radical=radical, strokes=strokes, freq_limit=freq_limit,
+                      page=page, page_size=page_size)
+        return r["total"], r["chars"]
+
+    def xiehouyu(self, s, n=None):
+        """ same contract as MultiChineseDict.lookupXiehouyu() """
+        return self.call("xiehouyu", key=s, n=n)
+
+def connectDictServer(fn=SOCKET_FILE):
+    """ DictClient connected to the daemon at fn, None if it isn't running """
+    if not os.path.exists(fn):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(fn)
+    except OSError as e:
+        logging.debug("dictionary daemon at %s is not running: %s", fn, e)
+        sock.close()
+        return None
+    return DictClient(sock)
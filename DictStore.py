@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+On-disk dictionary store
+
+DictStore keeps every ChChar/ChWord/ChIdiom built by MultiChineseDict in a SQLite
+file, one row per entry. A lookup is a primary key seek that decodes only the
+requested entry and the names/freq of its linked words and idioms (the top
+RELATED_TOP_K kept by ChChar), so a single lookup doesn't pay for loading the
+whole dictionary.
+
+The store records the dicts/ fingerprint it was generated from. openDictStore()
+regenerates it from MultiChineseDict when dicts/ changes, and answers with that
+MultiChineseDict itself when cache/ can't be written.
+
+"""
+
+import os
+import json
+import logging
+import sqlite3
+from MultiChineseDict import MultiChineseDict, ChChar, ChWord, ChIdiom
+from MultiChineseDict import CACHE_DIR, dictFingerprint
+
+STORE_FILE="%s/MultiChineseDict.sqlite"%CACHE_DIR
+STORE_VERSION=2
+
+KIND_CHAR="char"
+KIND_WORD="word"
+KIND_IDIOM="idiom"
+
+class DictStore:
+    """ read only access to a generated store """
+
+    def __init__(self, fn=STORE_FILE):
+        self.fn = fn
+        self.db = sqlite3.connect("file:%s?mode=ro"%fn, uri=True)
+        self.db.execute("PRAGMA mmap_size=268435456")
+        return
+
+    def close(self):
+        self.db.close()
+
+    def meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        if not row:
+            return None
+        return json.loads(row[0])
+
+    def isFresh(self):
+        """ whether the store was generated from current dicts/ """
+        try:
+            fingerprint = self.meta("fingerprint")
+            return self.meta("version") == STORE_VERSION and \
+                    fingerprint == json.loads(json.dumps(dictFingerprint(known=fingerprint)))
+        except sqlite3.Error:
+            return False
+
+    def fetch(self, kind, key):
+        return self.db.execute(
+                "SELECT freq, raw_js, words, idioms FROM entries WHERE kind=? AND key=?",
+                (kind, key)).fetchone()
+
+    def has(self, kind, key):
+        return self.db.execute("SELECT 1 FROM entries WHERE kind=? AND key=?",
+                               (kind, key)).fetchone() is not None
+
+    def count(self, kind):
+        return self.db.execute("SELECT count(*) FROM entries WHERE kind=?", (kind,)).fetchone()[0]
+
+    def keys(self, kind):
+        """ keys of all words (KIND_WORD) or idioms (KIND_IDIOM), in key order """
+        return (key for key, in self.db.execute("SELECT key FROM entries WHERE kind=?", (kind,)))
+
+    def entries(self, kind, exclude=()):
+        """ (key, entry) of all words or idioms except the keys in exclude, decoded one by one """
+        decode = DictStore.decodeWord if kind == KIND_WORD else DictStore.decodeIdiom
+        rows = self.db.execute("SELECT key, freq, raw_js FROM entries WHERE kind=?", (kind,))
+        return ((key, decode(key, freq, raw_js)) for key, freq, raw_js in rows
+                if not key in exclude)
+
+    def lookupChar(self, ch):
+        row = self.fetch(KIND_CHAR, ch)
+        if not row:
+            raise KeyError(ch)
+        freq, raw_js, words, idioms = row
+        js = json.loads(raw_js)
+        x7 = js["x7explanation"]
+        cc = ChChar(ch, js)
+        cc.raw_js["x7explanation"] = x7
+        cc.freq = freq
+        for w, f in json.loads(words):
+            cw = ChWord(w, {"ci":w, "explanation":None})
+            cw.freq = f
+            cc.addWord(cw)
+        for w, f in json.loads(idioms):
+            idm = ChIdiom(w, {"word":w, "pinyin":None, "explanation":None})
+            idm.freq = f
+            cc.addIdiom(idm)
+        return cc
+
+    @staticmethod
+    def decodeWord(word, freq, raw_js):
+        cw = ChWord(word, json.loads(raw_js))
+        cw.freq = freq
+        return cw
+
+    @staticmethod
+    def decodeIdiom(idiom, freq, raw_js):
+        js = json.loads(raw_js)
+        x7 = js["x7explanation"]
+        idm = ChIdiom(idiom, js)
+        idm.raw_js["x7explanation"] = x7
+        idm.freq = freq
+        return idm
+
+    def lookupWord(self, word):
+        row = self.fetch(KIND_WORD, word)
+        if not row:
+            raise KeyError(word)
+        return DictStore.decodeWord(word, row[0], row[1])
+
+    def lookupIdiom(self, idiom):
+        row = self.fetch(KIND_IDIOM, idiom)
+        if not row:
+            raise KeyError(idiom)
+        return DictStore.decodeIdiom(idiom, row[0], row[1])
+
+    def entriesUsing(self, kind, ch, exclude=()):
+        """
+        all words (KIND_WORD) or idioms (KIND_IDIOM) with freq > 0 containing ch, except
+        the keys in exclude. A scan of the table, for relatedWords()/relatedIdioms()
+        """
+        decode = DictStore.decodeWord if kind == KIND_WORD else DictStore.decodeIdiom
+        rows = self.db.execute("""SELECT key, freq, raw_js FROM entries
+                                  WHERE kind=? AND freq>0 AND instr(key, ?)>0""", (kind, ch))
+        return [decode(key, freq, raw_js) for key, freq, raw_js in rows if not key in exclude]
+
+    def lookup(self, s):
+        """ same contract as MultiChineseDict.lookup() """
+        if len(s) == 1:
+            return self.lookupChar(s)
+
+        try:
+            return self.lookupIdiom(s)
+        except KeyError:
+            return self.lookupWord(s)
+
+    def lookup_many(self, keys):
+        """ same contract as MultiChineseDict.lookup_many() """
+        results = []
+        for s in keys:
+            try:
+                results.append((s, self.lookup(s)))
+            except KeyError:
+                results.append((s, None))
+        return results
+
+    @staticmethod
+    def generate(md, fn=STORE_FILE):
+        """ write all entries of MultiChineseDict md to a new store at fn, False if it can't """
+        logging.info("generating dictionary store: %s", fn)
+        tmp_fn = "%s.%d.tmp"%(fn, os.getpid())
+
+        def rows():
+            for ch, cc in md.allChars.items():
+                yield (KIND_CHAR, ch, cc.freq, json.dumps(cc.raw_js, ensure_ascii=False),
+                       json.dumps([(cw.word, cw.freq) for cw in cc.words], ensure_ascii=False),
+                       json.dumps([(idm.idiom, idm.freq) for idm in cc.idioms],
+                                  ensure_ascii=False))
+            for w, cw in md.allWords.items():
+                yield (KIND_WORD, w, cw.freq, json.dumps(cw.raw_js, ensure_ascii=False),
+                       None, None)
+            for w, idm in md.allIdioms.items():
+                yield (KIND_IDIOM, w, idm.freq, json.dumps(idm.raw_js, ensure_ascii=False),
+                       None, None)
+
+        db = None
+        try:
+            os.makedirs(os.path.dirname(fn), exist_ok=True)
+            if os.path.exists(tmp_fn):
+                os.remove(tmp_fn)
+            db = sqlite3.connect(tmp_fn)
+            db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            db.execute("""CREATE TABLE entries (kind TEXT, key TEXT, freq INTEGER,
+                          raw_js TEXT, words TEXT, idioms TEXT,
+                          PRIMARY KEY (kind, key)) WITHOUT ROWID""")
+            db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows())
+            db.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("version", json.dumps(STORE_VERSION)),
+                ("fingerprint", json.dumps(dictFingerprint())),
+                ])
+            db.commit()
+            db.close()
+            db = None
+            os.replace(tmp_fn, fn)
+        except (OSError, sqlite3.Error) as e:
+            logging.warning("can't write dictionary store %s: %s", fn, e)
+            if db:
+                db.close()
+            if os.path.exists(tmp_fn):
+                os.remove(tmp_fn)
+            return False
+        return True
+
+def openDictStore(fn=STORE_FILE, md=None):
+    """
+    open the store at fn, (re)generate it from MultiChineseDict if it is stale.
+    The in-memory MultiChineseDict is returned instead when the store can't be written.
+    """
+    if os.path.exists(fn):
+        store = DictStore(fn)
+        if store.isFresh():
+            return store
+        store.close()
+        logging.info("dicts/ changed since store %s was generated", fn)
+
+    if not md:
+        md = MultiChineseDict()
+    if not DictStore.generate(md, fn):
+        return md
+    return DictStore(fn)
+
+if __name__ == "__main__":
+    logging.basicConfig(format='[DictStore: %(asctime)s %(levelname)s] %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    openDictStore().lookup("天").pp()
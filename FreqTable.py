@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+webdict word frequency table
+
+stdzn.webdict.freq has one "<word> <count> <rank>" line per word. FreqTable streams
+the file and keeps count and rank in two parallel arrays behind a word => row map,
+instead of one tuple per word.
+
+rank is what the rest of the tool calls "freq": small is hot, 0 means the word is
+not in the list.
+
+"""
+
+import gzip
+from array import array
+from bisect import bisect_left, bisect_right
+
+class FreqTable:
+    #rank limits of ★★★★★ .. ★
+    STAR_RANKS = (1000, 2500, 5000, 10000, 25000)
+
+    def __init__(self):
+        self.index = {} #word => row
+        self.words = [] #row => word
+        self.counts = array("q")
+        self.ranks = array("i")
+        self.rank_sorted = True #ranks are in ascending order, rank queries can bisect
+        return
+
+    @staticmethod
+    def load(fn):
+        """ build the table from a gzipped webdict freq file, line by line """
+        table = FreqTable()
+        with gzip.open(fn, "rt", encoding="utf-8") as fp:
+            for line in fp:
+                ch_w, count, rank = line.split()
+                table.add(ch_w, int(count), int(rank))
+        return table
+
+    def add(self, word, count, rank):
+        row = self.index.get(word)
+        if row is not None:
+            self.counts[row] = count
+            self.ranks[row] = rank
+            self.rank_sorted = False
+            return
+        if self.ranks and rank < self.ranks[-1]:
+            self.rank_sorted = False
+        self.index[word] = len(self.words)
+        self.words.append(word)
+        self.counts.append(count)
+        self.ranks.append(rank)
+        return
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __getitem__(self, word):
+        """ (count, rank) of word, like the old dict based table """
+        row = self.index[word]
+        return self.counts[row], self.ranks[row]
+
+    def rank(self, word, default=0):
+        row = self.index.get(word)
+        if row is None:
+            return default
+        return self.ranks[row]
+
+    def count(self, word, default=0):
+        row = self.index.get(word)
+        if row is None:
+            return default
+        return self.counts[row]
+
+    def rankOfMany(self, words, default=0):
+        """ ranks of all words, in an array parallel to words """
+        index = self.index
+        ranks = self.ranks
+        return array("i", [ranks[index[w]] if w in index else default for w in words])
+
+    def wordsBelowRank(self, n):
+        """ all words with rank < n, hottest first """
+        if self.rank_sorted:
+            return self.words[:bisect_left(self.ranks, n)]
+        rows = [row for row, rank in enumerate(self.ranks) if rank < n]
+        rows.sort(key=self.ranks.__getitem__)
+        return [self.words[row] for row in rows]
+
+    @staticmethod
+    def stars(rank):
+        """ ★★★★★ .. "" for a rank """
+        return "★" * (len(FreqTable.STAR_RANKS) - bisect_right(FreqTable.STAR_RANKS, rank))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+Approximate match index over headwords, for "did you mean" suggestions
+
+A word one edit away from a headword (a char replaced, missing, extra or two
+neighbours swapped) shares a one-char deletion with it, or is one itself. The index
+keeps every one-char deletion of every multi-char headword, as the crc32 of the
+deletion in a sorted array next to an array of the headword rows it comes from.
+A query hashes its own deletions and bisects for them. Candidates found this way
+are checked to really be one edit away, which also weeds out crc32 collisions.
+A word of two or more chars only gets multi-char candidates: dropping a char of a
+two-char miss leaves a single char, a headword but hardly what was meant.
+
+Traditional/variant chars are mapped to their simplified form before the lookup
+(ChChar raw_js["oldword"]), so "書法" finds "书法" at distance 0.
+
+The arrays take about 12 bytes per deletion and are built on first use, see
+MultiChineseDict.suggest().
+
+"""
+
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from PinyinIndex import PinyinIndex
+
+EMPTY = frozenset()
+
+def deletions(word):
+    return [word[:i] + word[i+1:] for i in range(len(word))]
+
+def withinOneEdit(a, b):
+    """ whether b is a with one char replaced, removed or inserted, or two neighbours swapped """
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and \
+                a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) != len(b) + 1:
+        return False
+    i = 0
+    while i < len(b) and a[i] == b[i]:
+        i += 1
+    return a[i+1:] == b[i:]
+
+def crc(s):
+    return zlib.crc32(s.encode("utf-8"))
+
+class FuzzyIndex:
+    def __init__(self, words, variants=None, sounds=None):
+        """
+        words: sorted list of headwords, variants: {variant char: simplified char},
+        sounds: {char: frozenset of toneless readings}
+        """
+        self.words = words
+        self.variants = str.maketrans(variants or {})
+        self.sounds = sounds or {}
+        rows = [(crc(d), row) for row, w in enumerate(words) if len(w) > 1
+                for d in deletions(w)]
+        rows.sort()
+        self.hashes = array("I", [h for h, dummy in rows])
+        self.rows = array("i", [row for dummy, row in rows])
+        return
+
+    @staticmethod
+    def fromDict(md):
+        """ index all headwords of a built MultiChineseDict """
+        variants = {}
+        sounds = {}
+        for ch, cc in md.allChars.items():
+            old = cc.raw_js.get("oldword")
+            if old and len(old) == 1 and old != ch and not old in md.allChars:
+                variants[old] = ch
+            sounds[ch] = frozenset(PinyinIndex.normalize(p)[1] for p in cc.readings())
+        return FuzzyIndex(md.headwords.keys, variants, sounds)
+
+    def row(self, w):
+        """ row of headword w, None if it isn't one """
+        i = bisect_left(self.words, w)
+        if i < len(self.words) and self.words[i] == w:
+            return i
+        return None
+
+    def withDeletion(self, d):
+        """ rows of the headwords having deletion d """
+        h = crc(d)
+        lo = bisect_left(self.hashes, h)
+        hi = bisect_right(self.hashes, h, lo)
+        return self.rows[lo:hi]
+
+    def simplify(self, word):
+        """ word with its traditional/variant chars simplified, as it is matched """
+        return word.translate(self.variants)
+
+    def homophones(self, a, b):
+        """ whether chars a and b share a reading, tones aside """
+        return not self.sounds.get(a, EMPTY).isdisjoint(self.sounds.get(b, EMPTY))
+
+    def candidates(self, word):
+        """
+        {row: distance} of the headwords (self.words[row]) within one edit of word,
+        word itself excluded, and single chars too when word has more
+        """
+        found = {}
+        simplified = self.simplify(word)
+        if simplified != word:
+            row = self.row(simplified)
+            if row is not None:
+                found[row] = 0
+
+        rows = set(self.withDeletion(simplified)) #word misses a char
+        for d in deletions(simplified):
+            row = self.row(d) if len(d) > 1 else None #word has an extra char
+            if row is not None:
+                rows.add(row)
+            rows.update(self.withDeletion(d)) #a char replaced or swapped
+        for row in rows:
+            w = self.words[row]
+            if w != word and not row in found and withinOneEdit(simplified, w):
+                found[row] = 1
+        return found
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+Prefix index over all dictionary headwords
+
+HeadwordTrie keeps the keys of allChars/allWords/allIdioms as one sorted list with a
+parallel freq array. All headwords sharing a prefix are a contiguous range of that
+list, so walking down the trie one character at a time is narrowing the range with
+two bisects. It is as compact as the key list itself and pickles with the snapshot.
+
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left
+
+#sorts after any character a headword can continue with
+KEY_END = "\U0010ffff"
+
+class HeadwordTrie:
+    def __init__(self, headwords):
+        """ headwords: iterable of (word, freq) """
+        items = sorted(dict(headwords).items())
+        self.keys = [w for w, dummy in items]
+        self.freqs = array("i", [f for dummy, f in items])
+        self.maxlen = max(map(len, self.keys), default=0)
+        return
+
+    @staticmethod
+    def fromDict(md):
+        """ index all headwords of a built MultiChineseDict """
+        headwords = []
+        for d in (md.allChars, md.allWords, md.allIdioms):
+            for w, x in d.items():
+                headwords.append((w, x.freq))
+        return HeadwordTrie(headwords)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, word, freq=0):
+        """ index a headword added after the build, O(n) as the arrays are shifted """
+        i = bisect_left(self.keys, word)
+        if i < len(self.keys) and self.keys[i] == word:
+            self.freqs[i] = freq
+            return
+        self.keys.insert(i, word)
+        self.freqs.insert(i, freq)
+        self.maxlen = max(self.maxlen, len(word))
+        return
+
+    def __contains__(self, word):
+        i = bisect_left(self.keys, word)
+        return i < len(self.keys) and self.keys[i] == word
+
+    def prefixRange(self, prefix, lo=0, hi=None):
+        """ [lo, hi) of keys starting with prefix, searching inside [lo, hi) """
+        if hi is None:
+            hi = len(self.keys)
+        lo = bisect_left(self.keys, prefix, lo, hi)
+        hi = bisect_left(self.keys, prefix + KEY_END, lo, hi)
+        return lo, hi
+
+    def withPrefix(self, prefix, limit=None, by_freq=True):
+        """ headwords starting with prefix, hottest first (freq 0 last) if by_freq """
+        lo, hi = self.prefixRange(prefix)
+        rows = range(lo, hi)
+        if by_freq:
+            key = lambda i: (self.freqs[i] == 0, self.freqs[i])
+            if limit is not None:
+                rows = heapq.nsmallest(limit, rows, key=key)
+            else:
+                rows = sorted(rows, key=key)
+        elif limit is not None:
+            rows = rows[:limit]
+        return [self.keys[i] for i in rows]
+
+    def matchesAt(self, text, pos=0):
+        """ all headwords text[pos:] starts with, shortest first """
+        matches = []
+        lo, hi = 0, len(self.keys)
+        for end in range(pos + 1, min(len(text), pos + self.maxlen) + 1):
+            p = text[pos:end]
+            lo, hi = self.prefixRange(p, lo, hi)
+            if lo >= hi:
+                break
+            if self.keys[lo] == p:
+                matches.append(p)
+        return matches
+
+    def longestMatch(self, text, pos=0):
+        """ longest headword text[pos:] starts with, None if there is none """
+        matches = self.matchesAt(text, pos)
+        if not matches:
+            return None
+        return matches[-1]
+
+    def allMatches(self, text, accept=None):
+        """
+        every headword found at every position of text, shortest first at each
+        position. A char no multi-char headword covers is returned by itself. With
+        accept, only the multi-char headwords w with accept(w) are taken.
+
+        The same rule as jieba's cut_all mode, with our headwords instead of the jieba
+        dictionary: words only jieba knows aren't returned (cut_all gave them, and
+        they were reported as not found), while headwords jieba doesn't know are, and
+        the chars they cover aren't returned by themselves. Non-Chinese text isn't
+        split off either, its chars come one by one.
+        """
+        tokens = []
+        covered = 0
+        for pos in range(len(text)):
+            words = [w for w in self.matchesAt(text, pos)
+                     if len(w) > 1 and (accept is None or accept(w))]
+            if not words and pos >= covered:
+                tokens.append(text[pos])
+            for w in words:
+                tokens.append(w)
+                covered = max(covered, pos + len(w))
+        return tokens
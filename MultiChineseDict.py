@@ -22,14 +22,73 @@ allIdioms{} => class ChIdiom dictionary
 
 "x7explanation" is well formatted. "explanation" field is messy and will be discarded soon.
 
+Building from the gzip sources takes seconds, so the merged result is written to a
+snapshot file under cache/ and reloaded by later runs. The snapshot carries a
+fingerprint (size, mtime and sha1) of every file under dicts/ and is rebuilt
+automatically when any of them changes. Files whose size and mtime are unchanged
+keep their recorded sha1 and aren't read when the snapshot is loaded.
+
+headwords is a HeadwordTrie over all keys of the three dictionaries, for prefix
+enumeration and longest match in running text. pinyin is a PinyinIndex of the
+readings of all entries, for lookupPinyin(). chars is a CharIndex of the radical
+and stroke count of all chars, for lookupChars(). suggest() finds headwords one edit
+away from a word that isn't found, with a FuzzyIndex built on first use.
+renderX7() renders x7 explanations to HTML once per headword; with prerender_x7
+the HTML of all of them is rendered ahead and kept in the snapshot.
+
+A char only keeps its RELATED_TOP_K hottest words and idioms (ChChar.words/idioms).
+The full sorted lists are materialized on demand by relatedWords()/relatedIdioms().
+
+When a build is needed, the gzip sources are independent of each other and can be
+decoded concurrently in a process pool with MultiChineseDict(parallel=True).
+
+Equal strings of the entries are shared and x7 explanations are stored as shared
+tuples (internPayloads()), which pickle keeps shared in the snapshot.
+
+build() runs the phases of BUILD_LAYERS in order. With incremental=True the state
+left by a phase is cached under cache/layers/, keyed by the inputs of the phase and
+the keys of its upstream phases, and a rebuild starts after the deepest phase whose
+key is unchanged (see dict_build.py). Checkpoints are written lazily, see
+buildIncremental(). The phase graph and keys are recorded in
+the snapshot header.
+
+The raw json lists build() reads are released once it is done, and the sources it
+doesn't read (xiehouyu) are only decoded on first access, e.g. by lookupXiehouyu().
+Reading a released list raises AttributeError instead of decoding it again.
+
 """
 import os
+import gc
 import json
 import logging
 import gzip
+import hashlib
+import pickle
+import time
+from bisect import insort_right
+from operator import attrgetter
+from concurrent.futures import ProcessPoolExecutor
+from FreqTable import FreqTable
+from HeadwordTrie import HeadwordTrie
+from PinyinIndex import PinyinIndex
+from CharIndex import CharIndex
+from X7Renderer import X7Renderer
+from StringPool import StringPool
+from FuzzyIndex import FuzzyIndex
 
 SCRIPT_PATH=os.path.dirname(os.path.realpath(__file__))
 
+DICT_DIR="%s/dicts"%SCRIPT_PATH
+CACHE_DIR="%s/cache"%SCRIPT_PATH
+SNAPSHOT_FILE="%s/MultiChineseDict.snapshot"%CACHE_DIR
+SNAPSHOT_VERSION=11
+LAYER_DIR="%s/layers"%CACHE_DIR
+
+#number of hottest words/idioms kept for each char
+RELATED_TOP_K=32
+
+freqOf = attrgetter("freq")
+
 WORD_JSON="%s/dicts/word"%SCRIPT_PATH
 CI_JSON="%s/dicts/ci"%SCRIPT_PATH
 IDIOM_JSON="%s/dicts/idiom"%SCRIPT_PATH
@@ -37,21 +96,159 @@ XIEHOUYU_JSON="%s/dicts/xiehouyu"%SCRIPT_PATH
 WEBDICT_FREQ="%s/dicts/freq/stdzn.webdict.freq"%SCRIPT_PATH
 X7_DICT="%s/dicts/x7"%SCRIPT_PATH
 
-class MultiChineseDict:
-    def __init__(self):
-        self.jsWord = MultiChineseDict.loadJS(WORD_JSON)
-        self.jsCi = MultiChineseDict.loadJS(CI_JSON)
-        self.jsIdiom = MultiChineseDict.loadJS(IDIOM_JSON)
-        self.jsXiehouyu = MultiChineseDict.loadJS(XIEHOUYU_JSON)
+#MultiChineseDict attribute => source file it is decoded from
+SOURCE_FILES = {
+        "allFreq":WEBDICT_FREQ,
+        "x7ChWords":X7_DICT,
+        "jsWord":WORD_JSON,
+        "jsCi":CI_JSON,
+        "jsIdiom":IDIOM_JSON,
+        "jsXiehouyu":XIEHOUYU_JSON,
+        }
+
+#SOURCE_FILES build() reads, the others are decoded on first access
+BUILD_SOURCES = ("allFreq", "x7ChWords", "jsWord", "jsCi", "jsIdiom")
+
+#build phase => (inputs it reads, phases it builds on), in build order. An input is one
+#of SOURCE_FILES or "x7Headwords", the key set of the x7 dict: only attachX7Explanations()
+#reads the x7 explanations themselves. Every phase works on the state the one before it
+#left, so that one is always among its upstream phases.
+BUILD_LAYERS = (
+        ("buildChChars", ("jsWord", "allFreq"), ()),
+        ("buildChIdioms", ("jsIdiom", "allFreq"), ("buildChChars",)),
+        ("buildChWords", ("jsCi", "allFreq"), ("buildChChars", "buildChIdioms")),
+        ("buildChWordsFromX7Dict", ("x7Headwords", "allFreq"),
+            ("buildChChars", "buildChIdioms", "buildChWords")),
+        ("buildChWordsFromFreqList", ("allFreq",),
+            ("buildChChars", "buildChIdioms", "buildChWords", "buildChWordsFromX7Dict")),
+        ("attachX7Explanations", ("x7ChWords",), ("buildChWordsFromFreqList",)),
+        ("internPayloads", (), ("attachX7Explanations",)),
+        ("buildIndexes", (), ("internPayloads",)),
+        )
+
+#attributes a layer checkpoint holds. x7ChWords is decoded again for every incremental
+#build, see layerKeys()
+LAYER_STATE = ("allChars", "allWords", "allIdioms", "allFreq", "headwords", "pinyin",
+               "chars")
+
+def dictFingerprint(dict_dir=None, known=None):
+    """
+    (name, size, mtime, sha1) of every file under dict_dir (DICT_DIR). A file whose name, size
+    and mtime match an entry of the fingerprint known keeps the sha1 recorded there
+    and isn't read, so checking a snapshot against unchanged sources costs a stat
+    per file.
+    """
+    dict_dir = dict_dir or DICT_DIR
+    known = {(name, size, mtime):sha1 for name, size, mtime, sha1 in known or []}
+    fingerprint = []
+    for root, dirs, files in os.walk(dict_dir):
+        dirs.sort()
+        for name in sorted(files):
+            fn = os.path.join(root, name)
+            st = os.stat(fn)
+            rel = os.path.relpath(fn, dict_dir)
+            digest = known.get((rel, st.st_size, st.st_mtime_ns))
+            if digest is None:
+                sha1 = hashlib.sha1()
+                with open(fn, "rb") as fp:
+                    for chunk in iter(lambda: fp.read(1<<20), b""):
+                        sha1.update(chunk)
+                digest = sha1.hexdigest()
+            fingerprint.append((rel, st.st_size, st.st_mtime_ns, digest))
+    return fingerprint
+
+def writePickles(fn, *objs):
+    """ pickle objs one after another to fn atomically, return False if it can't be written """
+    tmp_fn = "%s.%d.tmp"%(fn, os.getpid())
+    gc_enabled = gc.isenabled()
+    #pickling allocates a lot but frees nothing cyclic, see loadSnapshot()
+    gc.disable()
+    try:
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        with open(tmp_fn, "wb") as fp:
+            for obj in objs:
+                pickle.dump(obj, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_fn, fn)
+    except OSError as e:
+        logging.warning("can't write %s: %s", fn, e)
+        if os.path.exists(tmp_fn):
+            os.remove(tmp_fn)
+        return False
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return True
+
+def snapshotLayers(fn=None):
+    """ [(phase, inputs, upstream phases, key)] the snapshot fn was built with, [] if unknown """
+    try:
+        with open(fn or SNAPSHOT_FILE, "rb") as fp:
+            return pickle.load(fp).get("layers", [])
+    except Exception:
+        return []
+
+def entriesUsing(entries, ch):
+    """ values of allWords/allIdioms whose key contains ch, a tiered map scans its cold tier too """
+    if hasattr(entries, "valuesUsing"):
+        return entries.valuesUsing(ch)
+    return [x for w, x in entries.items() if ch in w]
+
+def loadSource(name):
+    """ decode one of SOURCE_FILES, return (name, data, seconds). Runs in worker processes """
+    start = time.time()
+    if name == "allFreq":
+        data = FreqTable.load(SOURCE_FILES[name])
+    else:
+        data = MultiChineseDict.loadJS(SOURCE_FILES[name])
+    return name, data, time.time() - start
 
+class MultiChineseDict:
+    def __init__(self, snapshot=True, parallel=False, prerender_x7=False, incremental=False,
+                 load=True):
+        """ load=False leaves the dictionary empty, to set the sources and build() by hand """
         self.allChars = {} #所有汉字
         self.allWords = {} #所有词语
         self.allIdioms = {} #所有成语
         self.x7ChWords = {} #x7字典
 
-        self.allFreq = {} #webdict 词频数据
-
-        self.build()
+        self.allFreq = FreqTable() #webdict 词频数据
+        self.headwords = HeadwordTrie([]) #所有字词成语的前缀索引
+        self.pinyin = PinyinIndex() #拼音索引
+        self.chars = CharIndex() #部首笔画索引
+        self.x7Renderer = X7Renderer() #x7解释HTML
+        self.fuzzy = None #FuzzyIndex, built by the first suggest()
+        self.released = set() #sources dropped by releaseSources()
+
+        if not load:
+            return
+
+        if snapshot and self.loadSnapshot():
+            if prerender_x7 and not self.x7Renderer.rendered:
+                self.x7Renderer.prerender(self.x7ChWords)
+                self.saveSnapshot()
+            return
+
+        if incremental:
+            self.buildIncremental(parallel)
+        else:
+            self.loadSources(parallel)
+            self.build()
+        if prerender_x7:
+            self.x7Renderer.prerender(self.x7ChWords)
+
+        if snapshot:
+            self.saveSnapshot()
+
+    def __getattr__(self, name):
+        #jsWord, jsCi, jsIdiom and jsXiehouyu are decoded on first access, but not again
+        #once releaseSources() dropped them: decoding them costs more than the build
+        if name in self.__dict__.get("released", ()):
+            raise AttributeError("%s was released after the build, loadSources() it "
+                                 "explicitly to read it again"%name)
+        if name in SOURCE_FILES:
+            self.loadSources(names=[name])
+            return self.__dict__[name]
+        raise AttributeError(name)
 
     def lookup(self, s):
         if len(s) == 1:
@@ -62,19 +259,117 @@ class MultiChineseDict:
 
         return self.allWords[s]
 
+    def addWord(self, cw):
+        """
+        add ChWord cw after the build (a dictation word the dictionary misses), keeping
+        the headword index in step. The fuzzy index is rebuilt by the next suggest().
+        """
+        self.allWords[cw.word] = cw
+        self.headwords.add(cw.word, cw.freq)
+        self.fuzzy = None
+        return
+
+    def lookup_many(self, keys):
+        """ [(key, entry)] for all keys in order, entry is None if key isn't found """
+        results = []
+        for s in keys:
+            if len(s) == 1:
+                x = self.allChars.get(s)
+            else:
+                x = self.allIdioms.get(s) or self.allWords.get(s)
+            results.append((s, x))
+        return results
+
     @staticmethod
     def loadJS(jsonFile):
         fp = gzip.GzipFile(jsonFile, "r")
         return json.load(fp)
 
+    def loadSources(self, parallel=False, names=None):
+        """ decode names (default BUILD_SOURCES), concurrently in a process pool if parallel """
+        start = time.time()
+        names = list(BUILD_SOURCES if names is None else names)
+        if parallel and len(names) > 1:
+            workers = min(len(names), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(loadSource, names))
+        else:
+            results = [loadSource(name) for name in names]
+
+        for name, data, seconds in results:
+            setattr(self, name, data)
+            self.released.discard(name)
+            logging.info("load %s: %d entries in %.2fs",
+                    os.path.relpath(SOURCE_FILES[name], SCRIPT_PATH), len(data), seconds)
+        logging.info("load %d sources%s in %.2fs", len(results),
+                " in parallel" if parallel else "", time.time() - start)
+        return
+
+    def snapshotState(self):
+        """ everything build() produces, in the form stored in the snapshot """
+        return {
+                "allChars":self.allChars,
+                "allWords":self.allWords,
+                "allIdioms":self.allIdioms,
+                "x7ChWords":self.x7ChWords,
+                "allFreq":self.allFreq,
+                "headwords":self.headwords,
+                "pinyin":self.pinyin,
+                "chars":self.chars,
+                "x7Renderer":self.x7Renderer,
+               }
+
+    def saveSnapshot(self, fn=None):
+        """ write the built dictionary to fn (SNAPSHOT_FILE), False if it can't be written """
+        fn = fn or SNAPSHOT_FILE
+        fingerprint = dictFingerprint()
+        keys = self.layerKeys(fingerprint)
+        header = {"version":SNAPSHOT_VERSION, "fingerprint":fingerprint,
+                  "layers":[(name, inputs, upstream, keys[name])
+                            for name, inputs, upstream in BUILD_LAYERS]}
+        if not writePickles(fn, header, self.snapshotState()):
+            return False
+        logging.info("dictionary snapshot written to %s", fn)
+        return True
+
+    def loadSnapshot(self, fn=None):
+        """ load the built dictionary from fn (SNAPSHOT_FILE), False if it is missing or stale """
+        fn = fn or SNAPSHOT_FILE
+        if not os.path.exists(fn):
+            return False
+
+        gc_enabled = gc.isenabled()
+        #the snapshot only holds acyclic objects, collecting during unpickle is wasted work
+        gc.disable()
+        try:
+            with open(fn, "rb") as fp:
+                header = pickle.load(fp)
+                if header.get("version") != SNAPSHOT_VERSION:
+                    logging.info("dictionary snapshot %s has old format, rebuild", fn)
+                    return False
+                fingerprint = header.get("fingerprint")
+                if fingerprint != dictFingerprint(known=fingerprint):
+                    logging.info("dicts/ changed since snapshot %s, rebuild", fn)
+                    return False
+                state = pickle.load(fp)
+        except Exception as e:
+            logging.warning("can't load dictionary snapshot %s: %s", fn, e)
+            return False
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        for k, v in state.items():
+            setattr(self, k, v)
+        logging.info("load %d 单字, %d 单词, %d 成语 from snapshot %s",
+                len(self.allChars), len(self.allWords), len(self.allIdioms), fn)
+        return True
+
     def buildChChars(self):
         for word in self.jsWord:
             cc = ChChar(word["word"], word)
             self.allChars[word["word"]] = cc
-            if cc.char in self.allFreq:
-                cc.freq = self.allFreq[cc.char][1]
-            if cc.char in self.x7ChWords:
-                cc.raw_js["x7explanation"] = self.x7ChWords[cc.char]
+            cc.freq = self.allFreq.rank(cc.char)
         logging.info("load %d 单字 from webdict", len(self.allChars))
         return
 
@@ -82,15 +377,12 @@ class MultiChineseDict:
         for idiom in self.jsIdiom:
             idm = ChIdiom(idiom["word"], idiom)
             self.allIdioms[idiom["word"]] = idm
-            if idm.idiom in self.x7ChWords:
-                idm.raw_js["x7explanation"] = self.x7ChWords[idm.idiom]
-            if idm.idiom in self.allFreq:
-                idm.freq = self.allFreq[idm.idiom][1]
+            idm.freq = self.allFreq.rank(idm.idiom)
             if idm.freq > 0: #去除冷门
                 for ch in list(set(list(idm.idiom))):
                     if ch in self.allChars:
                         cc = self.allChars[ch]
-                        cc.idioms.append(idm)
+                        cc.addIdiom(idm)
         logging.info("load %d 成语 from webdict", len(self.allIdioms))
         return
 
@@ -102,16 +394,13 @@ class MultiChineseDict:
                 continue
             cw = ChWord(ci["ci"], ci)
             self.allWords[ci["ci"]] = cw
-            if cw.word in self.x7ChWords:
-                cw.raw_js["x7explanation"] = self.x7ChWords[cw.word]
-            if cw.word in self.allFreq:
-                cw.freq = self.allFreq[cw.word][1]
+            cw.freq = self.allFreq.rank(cw.word)
             if cw.freq > 0: #去除冷门
                 if not cw.word in self.allIdioms:
                     for ch in list(set(list(cw.word))):
                         if ch in self.allChars:
                             cc = self.allChars[ch]
-                            cc.words.append(cw)
+                            cc.addWord(cw)
         logging.info("Ingored %d 单字 from 词语词典", num_ch_in_words)
         logging.info("load %d 词语 from webdict", len(self.allWords))
         return
@@ -119,155 +408,362 @@ class MultiChineseDict:
     def buildChWordsFromX7Dict(self):
         num_new_ch_from_x7 = 0
         num_new_wd_from_x7 = 0
-        for w, info in self.x7ChWords.items():
+        for w in self.x7ChWords:
             if len(w) == 1 and not w in self.allChars:
                 js = {
                         "word":w,
                         "oldword":None,
                         "strokes":None,
-                        "pinyin":info[0][3],
+                        "pinyin":[], #filled from x7 by attachX7Explanations()
                         "radicals":None,
                         "explanation":None,
                         "more":None,
-                        "x7explanation":self.x7ChWords[w]
+                        "x7explanation":[]
                      }
                 cc = ChChar(w ,js)
                 self.allChars[w] = cc
                 num_new_ch_from_x7 =  num_new_ch_from_x7 + 1
-                if cc.char in self.allFreq:
-                    cc.freq = self.allFreq[cc.char][1]
+                cc.freq = self.allFreq.rank(cc.char)
 
             if len(w)>1 and not w in self.allWords and not w in self.allIdioms:
-                cw = ChWord(w, js={"ci":w, "explanation":None, "x7explanation":info})
+                cw = ChWord(w, js={"ci":w, "explanation":None, "x7explanation":[]})
                 self.allWords[w] = cw
                 num_new_wd_from_x7 =  num_new_wd_from_x7 + 1
-                if cw.word in self.allFreq:
-                    cw.freq = self.allFreq[cw.word][1]
+                cw.freq = self.allFreq.rank(cw.word)
                 if cw.freq > 0: #去除冷门
                     if not cw.word in self.allIdioms:
                         for ch in list(set(list(cw.word))):
                             if ch in self.allChars:
                                 cc = self.allChars[ch]
-                                cc.words.append(cw)
+                                cc.addWord(cw)
         logging.info("add %d new 单字 from x7 dict", num_new_ch_from_x7)
         logging.info("add %d new 词语 from x7 dict", num_new_wd_from_x7)
         return
 
     def buildChWordsFromFreqList(self):
         num_from_freq = 0
-        for ch_w, freq in self.allFreq.items():
+        for ch_w, rank in zip(self.allFreq.words, self.allFreq.ranks):
             if len(ch_w)==1:
                 continue
             if not ch_w  in self.allWords and not ch_w in self.allIdioms:
                 #missing words, add to words list
-                cw = ChWord(ch_w, js={"ci":ch_w, "explanation":None})
+                cw = ChWord(ch_w)
                 num_from_freq = num_from_freq + 1
-                cw.freq = freq[1]
+                cw.freq = rank
                 self.allWords[ch_w] = cw
-                if cw.word in self.x7ChWords:
-                    cw.raw_js["x7explanation"] = self.x7ChWords[cw.word]
                 if cw.freq > 0: #去除冷门
                     if not cw.word in self.allIdioms:
                         for ch in list(set(list(cw.word))):
                             if ch in self.allChars:
                                 cc = self.allChars[ch]
-                                cc.words.append(cw)
+                                cc.addWord(cw)
         logging.info("load %d 词语 from frequency list", num_from_freq)
         return
 
-    def build(self):
-        logging.info("build webdict....")
-        self.readWebDictFreq()
-        self.buildX7()
+    def attachX7Explanations(self):
+        for w, x7e in self.x7ChWords.items():
+            for d in (self.allChars, self.allWords, self.allIdioms):
+                x = d.get(w)
+                if x is None:
+                    continue
+                if x.kind == "char" and x.raw_js["pinyin"] == []: #char only known from x7
+                    #only its pinyin, its explanations stay empty as ever (ChChar resets them)
+                    x.raw_js["pinyin"] = x7e[0][2]
+                    continue
+                x.raw_js["x7explanation"] = x7e
+        return
 
-        self.buildChChars()
-        self.buildChIdioms()
-        self.buildChWords()
-        self.buildChWordsFromX7Dict()
-        self.buildChWordsFromFreqList()
+    def internPayloads(self):
+        """ share equal strings and x7 explanations between entries, see StringPool """
+        pool = StringPool()
+        for w, x7e in self.x7ChWords.items():
+            self.x7ChWords[w] = pool.x7(x7e)
+        for d in (self.allChars, self.allWords, self.allIdioms):
+            for w, x in d.items():
+                js = x._raw_js if x.kind == "word" else x.raw_js
+                if js is None: #freq list only word, nothing to share
+                    continue
+                pool.strings(js)
+                if js["x7explanation"]:
+                    js["x7explanation"] = self.x7ChWords[w]
+                else:
+                    js["x7explanation"] = ()
+        logging.info("intern: %d duplicates dropped, %.1f MB saved",
+                pool.dropped, pool.saved/2**20)
+        return
 
+    def buildIndexes(self):
         logging.info("Total %d 单字, %d 单词, %d 成语",
                 len(self.allChars), len(self.allWords), len(self.allIdioms))
 
-        #sort associated words/idioms of a char by frequency value
-        for cc in self.allChars.values():
-            cc.words.sort(key=lambda cw: cw.freq, reverse=False) #small is hot
-            cc.idioms.sort(key = lambda idm: idm.freq, reverse=False)
+        self.headwords = HeadwordTrie.fromDict(self)
+        self.pinyin = PinyinIndex.fromDict(self)
+        self.chars = CharIndex.fromDict(self)
+        return
+
+    def build(self):
+        logging.info("build webdict....")
+        for name, dummy, dummy in BUILD_LAYERS:
+            getattr(self, name)()
+        self.releaseSources()
+        return
+
+    def releaseSources(self):
+        """ drop the decoded json lists, the entries built from them own their items now """
+        for name in ("jsWord", "jsCi", "jsIdiom"):
+            self.__dict__.pop(name, None)
+            self.released.add(name)
         return
 
-    def buildX7(self):
-        logging.info("loading x7 dict....")
-        fp = gzip.GzipFile(X7_DICT, "r")
-        self.x7ChWords = json.load(fp)
-        fp.close()
-        logging.info("%d words from x7 dict loaded", len(self.x7ChWords))
+    def layerKeys(self, fingerprint=None):
+        """ phase => key of everything it was built from, see BUILD_LAYERS """
+        if fingerprint is None:
+            fingerprint = dictFingerprint()
+        #content only, a touched but unchanged file keeps its layers
+        sha1s = {os.path.join(DICT_DIR, fn):sha1 for fn, dummy, dummy, sha1 in fingerprint}
+        inputs = {name:sha1s.get(fn) for name, fn in SOURCE_FILES.items()}
+        inputs["x7Headwords"] = hashlib.sha1(
+                "\n".join(sorted(self.x7ChWords)).encode("utf-8")).hexdigest()
+
+        keys = {}
+        for name, layer_inputs, upstream in BUILD_LAYERS:
+            key = [SNAPSHOT_VERSION, name, [inputs[x] for x in layer_inputs],
+                   [keys[x] for x in upstream]]
+            keys[name] = hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()
+        return keys
+
+    @staticmethod
+    def layerFile(name):
+        return "%s/%s.layer"%(LAYER_DIR, name)
+
+    def saveLayer(self, name, key):
+        """ checkpoint the state left by phase name """
+        state = {k:getattr(self, k) for k in LAYER_STATE}
+        return writePickles(MultiChineseDict.layerFile(name), key, state)
+
+    def loadLayer(self, name, key):
+        """ restore the state left by phase name, return False if it isn't cached with key """
+        fn = MultiChineseDict.layerFile(name)
+        if not os.path.exists(fn):
+            return False
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(fn, "rb") as fp:
+                if pickle.load(fp) != key:
+                    return False
+                state = pickle.load(fp)
+        except Exception as e:
+            logging.warning("can't load layer %s: %s", fn, e)
+            return False
+        finally:
+            if gc_enabled:
+                gc.enable()
+        for k, v in state.items():
+            setattr(self, k, v)
+        return True
+
+    def buildIncremental(self, parallel=False):
+        """
+        build() reusing the cached state of the deepest phase whose inputs and upstream
+        phases are unchanged, see BUILD_LAYERS. Only the phases after it are run.
+
+        A checkpoint pickles the whole dictionary, which takes longer than most phases,
+        so they are written lazily: always the state before attachX7Explanations(), for
+        x7 patches, and otherwise only the state before the first phase whose key
+        changed since the last snapshot, where this build would have liked to start.
+        A first build thus writes one checkpoint instead of five.
+        """
+        start = time.time()
+        self.loadSources(parallel, ["x7ChWords"]) #layerKeys() needs the x7 headwords
+        keys = self.layerKeys()
+        previous = {name:key for name, dummy, dummy, key in snapshotLayers()}
+        last = max(i for i, (dummy, layer_inputs, dummy) in enumerate(BUILD_LAYERS)
+                   if layer_inputs) #the last phase a rebuild can start at
+
+        done = 0
+        for i in range(len(BUILD_LAYERS), 0, -1):
+            if self.loadLayer(BUILD_LAYERS[i-1][0], keys[BUILD_LAYERS[i-1][0]]):
+                done = i
+                break
+        todo = BUILD_LAYERS[done:]
+        logging.info("reuse %s, rebuild %s",
+                ", ".join(name for name, dummy, dummy in BUILD_LAYERS[:done]) or "nothing",
+                ", ".join(name for name, dummy, dummy in todo) or "nothing")
+
+        names = []
+        for dummy, layer_inputs, dummy in todo:
+            for x in layer_inputs:
+                if x in SOURCE_FILES and x != "x7ChWords" and not x in names:
+                    names.append(x)
+        if names:
+            self.loadSources(parallel, names)
+
+        for i in range(done, len(BUILD_LAYERS)):
+            name = BUILD_LAYERS[i][0]
+            t = time.time()
+            getattr(self, name)()
+            #a rebuild only starts before a phase with inputs of its own
+            if i + 1 == last:
+                self.saveLayer(name, keys[name])
+            elif i + 1 < last and BUILD_LAYERS[i+1][1]:
+                nxt = BUILD_LAYERS[i+1][0]
+                if previous.get(name) == keys[name] and previous.get(nxt) != keys[nxt]:
+                    self.saveLayer(name, keys[name])
+            logging.info("%s: %.2fs", name, time.time() - t)
+        self.releaseSources()
+        logging.info("incremental build in %.2fs", time.time() - start)
+        return
+
+    def suggest(self, word, n=5):
+        """
+        up to n headwords close to word as [(headword, distance)], best first: fewer
+        edits, then a replaced char read like the one it replaces (a pinyin input
+        typo), then the same length, then hotter.
+        """
+        if self.fuzzy is None:
+            self.fuzzy = FuzzyIndex.fromDict(self)
+
+        words = self.fuzzy.words
+        freqs = self.headwords.freqs
+        #candidates are matched against the simplified word, so ranked against it too
+        simplified = self.fuzzy.simplify(word)
+        ranked = []
+        for row, dist in self.fuzzy.candidates(word).items():
+            w = words[row]
+            homophone = False
+            if dist == 1 and len(w) == len(simplified):
+                diff = [i for i in range(len(w)) if w[i] != simplified[i]]
+                if len(diff) == 1:
+                    homophone = self.fuzzy.homophones(simplified[diff[0]], w[diff[0]])
+            freq = freqs[row]
+            ranked.append(((dist, not homophone, len(w) != len(simplified), freq == 0, freq),
+                           w, dist))
+        ranked.sort()
+        return [(w, dist) for dummy, w, dist in ranked[:n]]
+
+    def lookupXiehouyu(self, s, limit=None):
+        """
+        歇后语 whose riddle or answer contains s, as [{"riddle", "answer"}]. The
+        xiehouyu source is only decoded by the first call.
+        """
+        found = []
+        for x in self.jsXiehouyu:
+            if s in x["riddle"] or s in x["answer"]:
+                found.append(x)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def lookupPinyin(self, pinyin, page=0, page_size=20):
+        """
+        chars/words/idioms read as pinyin ("shì", "shi" or "shi4"), hottest first.
+        Returns (total, entries of the page).
+        """
+        total, words = self.pinyin.page(pinyin, page, page_size)
+        return total, [self.lookup(w) for w in words]
+
+    def lookupChars(self, radical=None, strokes=None, freq_limit=None, page=0, page_size=20):
+        """
+        chars with radical and strokes (5, (5, 8) or "5-8"), ranked within freq_limit
+        if given, hottest first. Returns (total, ChChars of the page).
+        """
+        total, chars = self.chars.page(radical, strokes, freq_limit, page, page_size)
+        return total, [self.allChars[ch] for ch in chars]
+
+    def relatedWords(self, ch, n=None, freq_limit=None):
+        """
+        hottest n (all if None) words using ch, skipping words with freq above freq_limit.
+        Falls back to scanning allWords when the top-K kept by ch isn't enough.
+        """
+        cc = self.allChars[ch]
+        if cc.numWords <= RELATED_TOP_K or (n is not None and n <= RELATED_TOP_K):
+            words = cc.words
+        else:
+            words = [cw for cw in entriesUsing(self.allWords, ch)
+                     if cw.freq > 0 and not cw.word in self.allIdioms]
+            words.sort(key=freqOf) #small is hot
+        return ChChar.limitRelated(words, n, freq_limit)
+
+    def relatedIdioms(self, ch, n=None, freq_limit=None):
+        """ hottest n (all if None) idioms using ch, see relatedWords() """
+        cc = self.allChars[ch]
+        if cc.numIdioms <= RELATED_TOP_K or (n is not None and n <= RELATED_TOP_K):
+            idioms = cc.idioms
+        else:
+            idioms = [idm for idm in entriesUsing(self.allIdioms, ch) if idm.freq > 0]
+            idioms.sort(key=freqOf)
+        return ChChar.limitRelated(idioms, n, freq_limit)
 
     @staticmethod
     def prettyX7Explanation(x7e):
-        #print(x7e)
-        #s = "%s<br>"%x7e[0][0]
-        s = ""
-        num = 0
-        for x in x7e:
-            num = num+1
-            dummy, cx, pinyin, expl = x
-            assert len(x) == 4
-            if len(x7e)>1:
-                s = s + "<b>/～:%d/</b><br>"%num
-            if pinyin:
-                s = s + "[%s] " % pinyin
-            for c in cx:
-                s =  s + "<%s>"%c
-            s = s + "<br>"
-            for ex in expl:
-                s = s + "%s<br>"%ex
-            s = s + "<br>"
-        return s
-
-    def readWebDictFreq(self):
-        fp = gzip.GzipFile(WEBDICT_FREQ, "r")
-        for line in fp.readlines():
-            line = line.strip()
-            ch_w, freq, freq_pos = line.split()
-            freq = int(freq)
-            freq_pos = int(freq_pos)
-            ch_w = ch_w.decode("utf-8")
-            self.allFreq[ch_w] = (freq, freq_pos)
-        fp.close()
+        return X7Renderer.toHtml(x7e)
 
-        return
+    def renderX7(self, headword, x7e):
+        """ html of x7 explanation x7e of headword, cached by headword """
+        return self.x7Renderer.render(headword, x7e)
 
 class ChChar:
     """ 汉字 """
+    __slots__ = ("char", "raw_js", "freq", "words", "idioms", "numWords", "numIdioms")
+
+    kind = "char"
+    keys = ("word", "oldword", "strokes", "pinyin", "radicals",
+            "explanation", "more", "x7explanation")
+
     def __init__(self, char, js):
         self.char = char
         self.raw_js = js
-        self.keys = ["word", "oldword", "strokes", "pinyin", "radicals",
-                     "explanation", "more", "x7explanation"]
         self.raw_js["x7explanation"] = []
         self.freq = 0
-        self.words = []
-        self.idioms = []
+        self.words = [] #up to RELATED_TOP_K hottest, MultiChineseDict.relatedWords() has all
+        self.idioms = [] #up to RELATED_TOP_K hottest, see MultiChineseDict.relatedIdioms()
+        self.numWords = 0
+        self.numIdioms = 0
 
     def getName(self):
         return self.char
 
+    @staticmethod
+    def keepRelated(items, item):
+        """ keep items sorted by freq and at most RELATED_TOP_K long, earlier one wins a tie """
+        if not items or item.freq >= items[-1].freq:
+            if len(items) < RELATED_TOP_K:
+                items.append(item)
+            return
+        if len(items) >= RELATED_TOP_K:
+            items.pop()
+        insort_right(items, item, key=freqOf)
+
+    @staticmethod
+    def limitRelated(items, n, freq_limit):
+        if freq_limit:
+            items = [x for x in items if x.freq <= freq_limit]
+        return items[:n]
+
+    def addWord(self, cw):
+        self.numWords = self.numWords + 1
+        ChChar.keepRelated(self.words, cw)
+
+    def addIdiom(self, idm):
+        self.numIdioms = self.numIdioms + 1
+        ChChar.keepRelated(self.idioms, idm)
+
+    def readings(self):
+        return PinyinIndex.readings(self.raw_js)
+
+    def asDict(self):
+        """ JSON friendly form, see entryFromDict() """
+        return {"kind":self.kind, "key":self.char, "freq":self.freq, "raw_js":self.raw_js,
+                "words":[(cw.word, cw.freq) for cw in self.words],
+                "idioms":[(idm.idiom, idm.freq) for idm in self.idioms]}
+
     def __repr__(self):
         return "%s , %s, %d"%(self.char, self.raw_js["pinyin"], self.freq)
 
     @staticmethod
     def num2star(num):
-        if num<1000:
-            return "★★★★★"
-        if num<2500:
-            return "★★★★"
-        if num<5000:
-            return "★★★"
-        if num<10000:
-            return "★★"
-        if num<25000:
-            return "★"
-        return ""
+        return FreqTable.stars(num)
 
     def pp(self):
         print("%s [%s] %s"%(self.char, self.raw_js["pinyin"], ChChar.num2star(self.freq)))
@@ -285,15 +781,45 @@ class ChChar:
 
 
 class ChWord:
-    """ 词语 """
-    def __init__(self, word, js):
+    """
+    词语
+
+    Most words only come from the frequency list and never get looked at, so raw_js
+    can be None until it is accessed and chars is computed on access.
+    """
+    __slots__ = ("word", "_raw_js", "freq")
+
+    kind = "word"
+    keys = ("ci", "explanation", "x7explanation")
+
+    def __init__(self, word, js=None):
         self.word = word
-        self.raw_js = js
-        self.keys = ["ci", "explanation", "x7explanation"]
-        if not "x7explanation" in js:
-            self.raw_js["x7explanation"] = []
+        self._raw_js = js
+        if js is not None and not "x7explanation" in js:
+            js["x7explanation"] = []
         self.freq = 0
-        self.chars = list(set(list(word)))
+
+    @property
+    def raw_js(self):
+        if self._raw_js is None:
+            self._raw_js = {"ci":self.word, "explanation":None, "x7explanation":[]}
+        return self._raw_js
+
+    @raw_js.setter
+    def raw_js(self, js):
+        self._raw_js = js
+
+    @property
+    def chars(self):
+        return list(set(self.word))
+
+    def readings(self):
+        if self._raw_js is None:
+            return []
+        return PinyinIndex.readings(self._raw_js)
+
+    def asDict(self):
+        return {"kind":self.kind, "key":self.word, "freq":self.freq, "raw_js":self.raw_js}
 
     def getName(self):
         return self.word
@@ -314,14 +840,27 @@ class ChWord:
 
 class ChIdiom:
     """ 成语 """
+    __slots__ = ("idiom", "raw_js", "freq")
+
+    kind = "idiom"
+    keys = ("word", "pinyin", "abbrivation", "derivation",
+            "example", "explanation", "x7explanation")
+
     def __init__(self, idiom, js):
         self.idiom = idiom
         self.raw_js = js
-        self.keys = ["word", "pinyin", "abbrivation", "derivation",
-                     "example", "explanation", "x7explanation"]
         self.raw_js["x7explanation"] = []
         self.freq = 0
-        self.chars = list(set(list(idiom)))
+
+    @property
+    def chars(self):
+        return list(set(self.idiom))
+
+    def readings(self):
+        return PinyinIndex.readings(self.raw_js)
+
+    def asDict(self):
+        return {"kind":self.kind, "key":self.idiom, "freq":self.freq, "raw_js":self.raw_js}
 
     def getName(self):
         return self.idiom
@@ -340,6 +879,28 @@ class ChIdiom:
         else:
             print("解释: <无>")
 
+def entryFromDict(d):
+    """ rebuild a ChChar/ChWord/ChIdiom from its asDict() form """
+    js = d["raw_js"]
+    x7 = js.get("x7explanation", [])
+    if d["kind"] == "char":
+        x = ChChar(d["key"], js)
+        for w, f in d["words"]:
+            cw = ChWord(w)
+            cw.freq = f
+            x.addWord(cw)
+        for w, f in d["idioms"]:
+            idm = ChIdiom(w, {"word":w, "pinyin":None, "explanation":None})
+            idm.freq = f
+            x.addIdiom(idm)
+    elif d["kind"] == "idiom":
+        x = ChIdiom(d["key"], js)
+    else:
+        x = ChWord(d["key"], js)
+    x.raw_js["x7explanation"] = x7
+    x.freq = d["freq"]
+    return x
+
 if __name__ == "__main__":
     logging.basicConfig(format='[MultiChineseDict: %(asctime)s %(levelname)s] %(message)s',
                         datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+Pinyin => headwords reverse index
+
+Every reading of a char/word/idiom (raw_js["pinyin"] and the pinyin of each x7
+explanation) is normalized to two keys:
+
+    tone marked: "shì", "tiānqì"     (lower case, no spaces or punctuation)
+    toneless:    "shi", "tianqi"     (ü is written as v)
+
+A query can be given tone marked, toneless or with tone numbers ("shi4",
+"tian1qi4"). Each key holds its headwords hottest first.
+
+"""
+
+import re
+import unicodedata
+
+TONE_MARKS = {"̄":1, "́":2, "̌":3, "̀":4}
+DIAERESIS = "̈"
+
+#the x7 dict writes pinyin with IPA letters and a dot for the neutral tone
+PINYIN_FIXES = str.maketrans({"ɡ":"g", "ɑ":"a"})
+
+class PinyinIndex:
+    def __init__(self):
+        self.marked = {} #"shì" => [headwords]
+        self.toneless = {} #"shi" => [headwords]
+        return
+
+    @staticmethod
+    def normalize(pinyin):
+        """ (tone marked key, toneless key) of a pinyin string """
+        pinyin = unicodedata.normalize("NFD", pinyin.translate(PINYIN_FIXES).lower())
+        marked = []
+        toneless = []
+        for c in pinyin:
+            if "a" <= c <= "z":
+                marked.append(c)
+                toneless.append(c)
+            elif c in TONE_MARKS:
+                marked.append(c)
+            elif c == DIAERESIS:
+                marked.append(c)
+                if toneless and toneless[-1] == "u":
+                    toneless[-1] = "v"
+        return unicodedata.normalize("NFC", "".join(marked)), "".join(toneless)
+
+    @staticmethod
+    def numberedToMarked(pinyin):
+        """ "lv4shi1" => "lǜshī", syllables without a tone number are kept as they are """
+        def mark(m):
+            syllable, tone = m.group(1).replace("v", "ü"), int(m.group(2))
+            if tone in (0, 5):
+                return syllable
+            if "a" in syllable:
+                i = syllable.index("a")
+            elif "e" in syllable:
+                i = syllable.index("e")
+            elif "ou" in syllable:
+                i = syllable.index("o")
+            else:
+                i = max(syllable.rfind(v) for v in "iouü")
+            tone_mark = [k for k, v in TONE_MARKS.items() if v == tone][0]
+            return unicodedata.normalize("NFC",
+                    syllable[:i+1] + tone_mark + syllable[i+1:])
+        return re.sub(r"([a-zü]+)([0-5])", mark, pinyin.lower().replace("u:", "v"))
+
+    @staticmethod
+    def isPinyin(s):
+        """ whether s can be a reading: a non empty string without hanzi or other scripts """
+        return isinstance(s, str) and s.strip() != "" and \
+                not any(unicodedata.category(c) == "Lo" for c in s)
+
+    @staticmethod
+    def readings(raw_js):
+        """ all pinyin strings in raw_js of a ChChar/ChWord/ChIdiom """
+        pinyin = raw_js.get("pinyin")
+        if isinstance(pinyin, (list, tuple)):
+            readings = list(pinyin)
+        else:
+            readings = [pinyin]
+        for ex in raw_js.get("x7explanation") or []:
+            readings.append(ex[2])
+        return [p for p in readings if PinyinIndex.isPinyin(p)]
+
+    def add(self, pinyin, headword):
+        marked, toneless = PinyinIndex.normalize(pinyin)
+        if not toneless:
+            return
+        for index, key in ((self.marked, marked), (self.toneless, toneless)):
+            words = index.setdefault(key, [])
+            if not headword in words:
+                words.append(headword)
+        return
+
+    @staticmethod
+    def fromDict(md):
+        """ index every reading of every entry of a built MultiChineseDict """
+        index = PinyinIndex()
+        freq = {}
+        for d in (md.allChars, md.allIdioms, md.allWords):
+            for w, x in d.items():
+                for pinyin in x.readings():
+                    index.add(pinyin, w)
+                    freq[w] = x.freq
+
+        hot_first = lambda w: (freq[w] == 0, freq[w])
+        for words in index.marked.values():
+            words.sort(key=hot_first)
+        for words in index.toneless.values():
+            words.sort(key=hot_first)
+        return index
+
+    def find(self, pinyin):
+        """ all headwords read as pinyin (marked, toneless or "shi4"), hottest first """
+        if re.search(r"[0-5]", pinyin):
+            pinyin = PinyinIndex.numberedToMarked(pinyin)
+        marked, toneless = PinyinIndex.normalize(pinyin)
+        if any(c in TONE_MARKS for c in unicodedata.normalize("NFD", marked)):
+            return self.marked.get(marked, [])
+        return self.toneless.get(toneless, [])
+
+    def page(self, pinyin, page=0, page_size=20):
+        """ (total, headwords of page page) for pinyin """
+        words = self.find(pinyin)
+        return len(words), words[page*page_size:(page+1)*page_size]
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+Example sentence allocator
+
+Every note gets the example sentence of its word that has been handed out least so
+far, over all words: a sentence shared by several words is used up for all of them.
+Ties go to the sentence met first in the lesson, so a deck comes out the same on
+every run.
+
+Each word keeps a min-heap of (uses, position, sentence). A pick increments the uses
+of one sentence, which leaves the entries of the other words holding that sentence
+too low. Uses only grow, so an entry is a lower bound: pick() checks the top against
+the real count and pushes it back with the real count when it is stale. An entry
+that is right is then the least used sentence of the word. A pick costs O(log n) in
+the sentences of the word, instead of sorting them. Most words only get one note,
+so the first pick of a word is a plain scan and the heap is built by the second.
+
+"""
+
+import heapq
+
+class SentenceAllocator:
+    def __init__(self):
+        self.uses = {} #sentence => times handed out
+        self.heaps = {} #word => heap of (uses, position, sentence), None after one pick
+        return
+
+    def heap(self, word, sentences):
+        heap = self.heaps[word]
+        if heap is None or len(heap) != len(sentences):
+            heap = [(self.uses.get(s, 0), i, s) for i, s in enumerate(sentences)]
+            heapq.heapify(heap)
+            self.heaps[word] = heap
+        return heap
+
+    def pick(self, word, sentences):
+        """ least used of sentences (in lesson order) for word, counted as used """
+        if not word in self.heaps:
+            uses = self.uses
+            s = min(sentences, key=lambda s: uses.get(s, 0))
+            uses[s] = uses.get(s, 0) + 1
+            self.heaps[word] = None
+            return s
+
+        heap = self.heap(word, sentences)
+        while True:
+            uses, i, s = heap[0]
+            if uses == self.uses.get(s, 0):
+                break
+            heapq.heapreplace(heap, (self.uses[s], i, s))
+        self.uses[s] = uses + 1
+        heapq.heapreplace(heap, (uses + 1, i, s))
+        return s
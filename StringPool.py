@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+Deduplicating pool of strings and tuples
+
+Every value json decodes is a new object, so a pinyin, a part of speech tag in the
+cx list of an x7 sense or a sense string shared by several entries exists once per
+use. StringPool keeps the first copy of each equal string or tuple and hands it
+out for all later ones. x7() also turns x7 explanations into tuples, which are
+smaller than lists and can be shared the same way.
+
+The pool only lives during MultiChineseDict.build() (see internPayloads()); pickle
+keeps shared objects shared, so the snapshot and the layer checkpoints stay
+deduplicated when loaded. saved is an estimate of the bytes given back: the
+duplicates dropped plus the lists replaced by tuples.
+
+"""
+
+import sys
+
+class StringPool:
+    def __init__(self):
+        self.pool = {}
+        self.dropped = 0 #duplicates replaced by the pooled copy
+        self.saved = 0 #bytes
+        return
+
+    def intern(self, x):
+        """ the pooled copy of string or tuple x """
+        y = self.pool.setdefault(x, x)
+        if y is not x:
+            self.dropped += 1
+            self.saved += sys.getsizeof(x)
+        return y
+
+    def tuple(self, items):
+        """ the pooled tuple of items, a list it replaces is counted as saved """
+        t = tuple(self.intern(x) if isinstance(x, str) else x for x in items)
+        if isinstance(items, list):
+            self.saved += sys.getsizeof(items) - sys.getsizeof(t)
+        return self.intern(t)
+
+    def x7(self, x7e):
+        """ x7 explanation [[word, cx, pinyin, explanations]] as pooled tuples """
+        return self.tuple([self.tuple([w, self.tuple(cx), pinyin, self.tuple(expl)])
+                           for w, cx, pinyin, expl in x7e])
+
+    def strings(self, d):
+        """ pool all string values of dict d in place """
+        for k, v in d.items():
+            if isinstance(v, str):
+                d[k] = self.intern(v)
+        return
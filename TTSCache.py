@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+Content-addressed cache of TTS audio
+
+The notes name their audio after the word ("好.mp3"), the md5 of a dictation
+sentence or the lesson and title of an article, so a file name says nothing about
+the voice it was made with. The cache keys audio by what produced it: the sha1 of
+the text or SSML together with the language, voice, speaking rate, encoding and
+backend, and the paragraph break time for SSML. The manifest (MANIFEST_FILE in TTS_OUTPUT_DIR, which
+Anki leaves alone as it starts with "_") records the key of every file written:
+
+    {"好.mp3": "3f2a...", "lesson1.title.mp3": "9c01...", ...}
+
+fetch() tells whether a file already holds the audio of its content. When another
+file holds the same audio it is copied instead of synthesized again; when the key
+differs (a new voice or rate in Config.yaml) the file is stale and made again.
+probe() asks the same without copying or recording anything.
+Files from before the manifest existed are taken as they are and recorded with the
+current key, so switching to the cache doesn't synthesize a whole media folder
+again.
+
+TTS_OUTPUT_DIR is usually the Anki media folder, with tens of thousands of files
+and often on a synced or network file system. It is listed once with os.scandir()
+on the first check and the names are kept in a set, updated as files are written,
+so checking a note costs no stat call.
+
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from TTSService import writeAudio
+
+MANIFEST_FILE = "_tts.manifest.json"
+
+class TTSCache:
+    def __init__(self, tts, output_dir):
+        self.output_dir = os.path.normpath(output_dir)
+        self.fn = os.path.join(output_dir, MANIFEST_FILE)
+        self.params = [tts.language_code, tts.voice_name, tts.speaking_rate, "MP3",
+                       type(tts.backend).__name__]
+        self.break_time = tts.paragraph_break_time #only SSML has paragraph breaks
+        self.files = {} #media file name => key
+        self.byKey = {} #key => media file name
+        self.adopted = 0 #files found without a key
+        self.present = None #names of the files in output_dir, listed on first use
+        self.dirty = False
+        self.lock = threading.Lock()
+        if os.path.exists(self.fn):
+            with open(self.fn, "r") as fp:
+                self.files = json.load(fp)
+        for name, key in self.files.items():
+            self.byKey[key] = name
+        return
+
+    def key(self, kind, content):
+        """ key of the audio of content, kind is "text" or "ssml" """
+        params = self.params + [self.break_time] if kind == "ssml" else self.params
+        s = json.dumps([kind, content] + params, ensure_ascii=False)
+        return hashlib.sha1(s.encode("utf-8")).hexdigest()
+
+    def name(self, output):
+        """ output relative to output_dir """
+        output = os.path.normpath(output)
+        prefix = os.path.join(self.output_dir, "")
+        if output.startswith(prefix):
+            return output[len(prefix):]
+        return os.path.relpath(output, self.output_dir)
+
+    def exists(self, name):
+        if os.sep in name:
+            return os.path.exists(os.path.join(self.output_dir, name))
+        with self.lock:
+            if self.present is None:
+                with os.scandir(self.output_dir) as it:
+                    self.present = {e.name for e in it}
+            return name in self.present
+
+    def record(self, kind, content, output):
+        """ output now holds the audio of content """
+        with self.lock:
+            key = self.key(kind, content)
+            name = self.name(output)
+            old = self.files.get(name)
+            if old and self.byKey.get(old) == name:
+                del self.byKey[old]
+            self.files[name] = key
+            self.byKey[key] = name
+            if self.present is not None:
+                self.present.add(name)
+            self.dirty = True
+        return
+
+    def probe(self, kind, content, output):
+        """
+        whether output holds the audio of content, or is a file of an earlier run
+        fetch() would take as it is. Nothing is copied or recorded.
+        """
+        name = self.name(output)
+        return self.exists(name) and self.files.get(name) in (None, self.key(kind, content))
+
+    def fetch(self, kind, content, output):
+        """
+        whether output holds the audio of content, copying it from another file of the
+        same key if there is one. False if it has to be synthesized.
+        """
+        key = self.key(kind, content)
+        name = self.name(output)
+        recorded = self.files.get(name)
+        if self.exists(name):
+            if recorded == key:
+                return True
+            if recorded is None:
+                self.adopted += 1
+                self.record(kind, content, output)
+                return True
+            logging.info("tts audio %s is stale, make it again", name)
+
+        src = self.byKey.get(key)
+        if src and src != name and self.exists(src):
+            with open(os.path.join(self.output_dir, src), "rb") as fp:
+                writeAudio(output, fp.read())
+            self.record(kind, content, output)
+            return True
+        return False
+
+    def save(self):
+        """ write the manifest if it changed """
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp = self.fn + ".tmp"
+            with open(tmp, "w") as fp:
+                json.dump(self.files, fp, ensure_ascii=False)
+            os.replace(tmp, self.fn)
+            self.dirty = False
+        if self.adopted:
+            logging.info("tts cache: %d audio files of earlier runs recorded", self.adopted)
+            self.adopted = 0
+        return
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+Concurrent TTS synthesis
+
+A TTS request is a network round trip of a fraction of a second, nearly all of it
+spent waiting, so a lesson with hundreds of new words is synthesized by
+TTS_WORKERS threads at once. A token bucket keeps the requests within the quota
+of the provider: TTS_RATE_LIMIT requests per second on average, bursts of up to
+TTS_RATE_BURST. Every request gets TTS_TIMEOUT seconds. All three are read from
+Config.yaml:
+
+    TTS_WORKERS: 8
+    TTS_RATE_LIMIT: 15
+    TTS_RATE_BURST: 15
+    TTS_TIMEOUT: 30
+
+A job is (kind, content, output) with kind "text" or "ssml". With a TTSCache, jobs
+whose output already holds their audio are skipped and done jobs are recorded in
+its manifest. The TTS service writes each output atomically, so a failed job
+leaves no file behind and is retried by the next run. Failed jobs are logged and
+returned, the others still complete.
+
+Run this file to compare serial and pooled synthesis against the fake backend
+(TTSService.FakeBackend), offline:
+
+    ./TTSPool.py -n 500 -w 8 -l 0.2
+
+"""
+
+import os
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from TTSService import TTSService
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        """ rate tokens per second (None for no limit), up to burst of them saved up """
+        self.rate = rate
+        self.capacity = burst or max(1, rate or 1)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+        return
+
+    def take(self):
+        """ wait until a token is available and take it """
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last)*self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens)/self.rate
+            time.sleep(wait)
+
+class TTSPool:
+    def __init__(self, tts, workers=1, rate=None, burst=None, timeout=None, cache=None):
+        self.tts = tts
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.bucket = TokenBucket(rate, burst)
+        self.timeout = timeout
+        return
+
+    @staticmethod
+    def fromConfig(tts, config, cache=None):
+        return TTSPool(tts, int(config.get("TTS_WORKERS", 1)), config.get("TTS_RATE_LIMIT"),
+                       config.get("TTS_RATE_BURST"), config.get("TTS_TIMEOUT"), cache)
+
+    def run(self, job):
+        kind, content, output = job
+        self.bucket.take()
+        if kind == "ssml":
+            self.tts.synthesize_chinese_ssml(content, output, timeout=self.timeout)
+        else:
+            self.tts.synthesize_chinese_text(content, output, timeout=self.timeout)
+        if self.cache:
+            self.cache.record(kind, content, output)
+        return
+
+    def synthesize(self, jobs):
+        """ run all jobs [(kind, content, output)], return the failed ones """
+        #one job per output, the last one wins as it would running them in order
+        jobs = list({job[2]:job for job in jobs}.values())
+        if self.cache:
+            jobs = [job for job in jobs if not self.cache.fetch(*job)]
+        failed = []
+        if jobs:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+                for job, future in [(job, pool.submit(self.run, job)) for job in jobs]:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logging.error("tts of %s failed: %s", job[2], e)
+                        failed.append(job)
+        if self.cache:
+            self.cache.save()
+        if failed:
+            logging.error("%d of %d tts requests failed", len(failed), len(jobs))
+        return failed
+
+def main():
+    """ serial vs pooled synthesis of fake requests """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(prog=os.path.basename(__file__)
+            , description="TTSPool.py: benchmark concurrent TTS against a fake backend")
+    parser.add_argument('-n', '--num', type=int, default=200, help="requests, default is 200")
+    parser.add_argument('-w', '--workers', type=int, default=8,
+            help="threads of the pool, default is 8")
+    parser.add_argument('-r', '--rate', type=float, help="requests per second limit")
+    parser.add_argument('-l', '--latency', type=float, default=0.2,
+            help="seconds per fake request, default is 0.2")
+    args = parser.parse_args()
+    logging.basicConfig(format='[TTSPool.py: %(asctime)s %(levelname)s] %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S', level=logging.WARNING)
+
+    tts = TTSService({"TTS_BACKEND":"fake", "FAKE_TTS_LATENCY":args.latency})
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, workers in (("serial", 1), ("pool", args.workers)):
+            jobs = [("text", "词%d"%i, "%s/%s.%d.mp3"%(tmp_dir, label, i))
+                    for i in range(args.num)]
+            start = time.perf_counter()
+            failed = TTSPool(tts, workers, args.rate).synthesize(jobs)
+            seconds = time.perf_counter() - start
+            print("%-6s %2d workers: %d requests in %.2fs, %.1f/s, %d failed"%(
+                label, workers, len(jobs), seconds, len(jobs)/seconds, len(failed)))
+    return
+
+if __name__ == "__main__":
+    main()
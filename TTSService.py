@@ -5,20 +5,127 @@
 '''
 TTS service modules
 
-GoogleTTS - TTS from google
+TTSService - TTS service of the notes, synthesizing through a backend (GoogleTTS is
+             its old name, kept as an alias)
+GoogleBackend - TTS from google
+FakeBackend - local stand-in with a fixed latency, for benchmarks and offline runs
 XunfeiTTS - TTS from Xunfei (TBD)
 AmazonPollyTTS - TTS from Amazon(TBD)
+
+A backend turns text or SSML into audio bytes: synthesize(text=None, ssml=None,
+timeout=None). TTS_BACKEND in Config.yaml picks one of BACKENDS, "google" by
+default, or a backend object is passed to TTSService directly.
+
+GoogleBackend keeps one TextToSpeechClient for all requests (it is thread safe, so
+the threads of TTSPool share it), with the voice and audio configs built once. A
+failed request drops the client and the next one connects again.
+
+Audio is written to a temporary file next to the output and renamed over it, so an
+interrupted or failed synthesis never leaves a truncated mp3 that later runs would
+take as done. timeout is passed to the provider as the deadline of the request.
 '''
 
 import os
+import time
 import logging
 import html
-from google.cloud import texttospeech
+import hashlib
+import threading
+try:
+    from google.cloud import texttospeech
+except ImportError:
+    texttospeech = None
+
+def writeAudio(output, data):
+    """
+    write data to output atomically. The temporary file is created by open() like
+    the output used to be, so it gets the usual umask mode (0644, not mkstemp's 0600)
+    and the media folder stays readable by Anki sync and other users.
+    """
+    tmp = "%s.%d.%d.tmp"%(output, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp, "xb") as out:
+            out.write(data)
+        os.replace(tmp, output)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    logging.info('Audio content written to file %s', output)
+    return
+
+class GoogleBackend:
+    """ google cloud text-to-speech """
+
+    def __init__(self, tts):
+        if texttospeech is None:
+            raise RuntimeError("google-cloud-texttospeech is not installed")
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.abspath(
+                os.path.expanduser(tts.config["GOOGLE_APPLICATION_CREDENTIALS"]))
 
-class GoogleTTS:
-    """ Wrapper class to provide google TTS service """
+        self.voice = texttospeech.VoiceSelectionParams(
+                language_code=tts.language_code,
+                name=tts.voice_name,
+                ssml_gender=texttospeech.SsmlVoiceGender.FEMALE)
+        self.audio_config = texttospeech.AudioConfig(
+                audio_encoding=texttospeech.AudioEncoding.MP3,
+                speaking_rate=tts.speaking_rate)
+        self.client = None
+        self.lock = threading.Lock()
+        return
+
+    def getClient(self):
+        with self.lock:
+            if self.client is None:
+                self.client = texttospeech.TextToSpeechClient()
+            return self.client
+
+    def synthesize(self, text=None, ssml=None, timeout=None):
+        client = self.getClient()
+        if ssml is not None:
+            synthesis_input = texttospeech.SynthesisInput(ssml=ssml)
+        else:
+            synthesis_input = texttospeech.SynthesisInput(text=text)
+        try:
+            response = client.synthesize_speech(
+                    input=synthesis_input,
+                    voice=self.voice,
+                    audio_config=self.audio_config,
+                    timeout=timeout)
+        except Exception:
+            #connect again for the next request, unless another thread did already
+            with self.lock:
+                if self.client is client:
+                    self.client = None
+            raise
+        # The response's audio_content is binary.
+        return response.audio_content
 
-    def __init__(self, config):
+class FakeBackend:
+    """ stands in for google without network: waits FAKE_TTS_LATENCY seconds per request """
+
+    def __init__(self, tts):
+        self.latency = float(tts.config.get("FAKE_TTS_LATENCY", 0.2))
+        self.requests = 0
+        self.lock = threading.Lock()
+        return
+
+    def synthesize(self, text=None, ssml=None, timeout=None):
+        with self.lock:
+            self.requests += 1
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("fake tts request timed out after %ss"%timeout)
+        time.sleep(self.latency)
+        content = ssml if ssml is not None else text
+        return b"FAKE" + hashlib.md5(content.encode("utf-8")).digest()
+
+BACKENDS = {"google":GoogleBackend, "fake":FakeBackend}
+
+class TTSService:
+    """ TTS service of the notes, whichever backend synthesizes """
+
+    def __init__(self, config, backend=None):
         self.config = config
         self.language_code = "cmn-CN"
         self.voice_name = "cmn-CN-Wavenet-A"
@@ -37,9 +144,9 @@ class GoogleTTS:
         if "GOOGLE_TTS_PARAGRAPH_BREAK_TIME" in config:
             self.paragraph_break_time = config["GOOGLE_TTS_PARAGRAPH_BREAK_TIME"]
 
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.abspath(
-                os.path.expanduser(config["GOOGLE_APPLICATION_CREDENTIALS"]))
-
+        if backend is None:
+            backend = BACKENDS[config.get("TTS_BACKEND", "google")](self)
+        self.backend = backend
         return
 
     @staticmethod
@@ -69,51 +176,15 @@ class GoogleTTS:
         )
         return ssml
 
-    def synthesize_chinese_ssml(self, ssml_text, output):
+    def synthesize_chinese_ssml(self, ssml_text, output, timeout=None):
         """ synthesize Chinese from SSML input """
-        client = texttospeech.TextToSpeechClient()
-        synthesis_input = texttospeech.SynthesisInput(ssml=ssml_text)
-
-        voice = texttospeech.VoiceSelectionParams(
-                language_code=self.language_code,
-                name=self.voice_name,
-                ssml_gender=texttospeech.SsmlVoiceGender.FEMALE)
-
-        audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3,
-                speaking_rate=self.speaking_rate)
-
-        response = client.synthesize_speech(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config)
-
-        with open(output, "wb") as out:
-            out.write(response.audio_content)
-            logging.info('Audio content written to file %s', output)
+        writeAudio(output, self.backend.synthesize(ssml=ssml_text, timeout=timeout))
         return
 
-    def synthesize_chinese_text(self, content, output):
+    def synthesize_chinese_text(self, content, output, timeout=None):
         """ synthesize Chinese from pure text input """
-        client = texttospeech.TextToSpeechClient()
-        synthesis_input = texttospeech.SynthesisInput(text=content)
-
-        voice = texttospeech.VoiceSelectionParams(
-                language_code=self.language_code,
-                name=self.voice_name,
-                ssml_gender=texttospeech.SsmlVoiceGender.FEMALE)
-
-        audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3,
-                speaking_rate=self.speaking_rate)
-
-        response = client.synthesize_speech(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config)
-
-        # The response's audio_content is binary.
-        with open(output, "wb") as out:
-            out.write(response.audio_content)
-            logging.info('Audio content written to file %s', output)
+        writeAudio(output, self.backend.synthesize(text=content, timeout=timeout))
         return
+
+#the name from when google was the only backend
+GoogleTTS = TTSService
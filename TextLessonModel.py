@@ -26,6 +26,19 @@ import html
 from collections import OrderedDict
 import Config
 
+#DictClient of a running dictionary daemon, segment() uses its jieba when it is set
+DICT_SERVER = None
+
+def useDictServer(client):
+    global DICT_SERVER
+    DICT_SERVER = client
+
+def segment(s, cut_all=False):
+    """ jieba.cut() in process, or by the dictionary daemon """
+    if DICT_SERVER:
+        return DICT_SERVER.segment(s, cut_all)
+    return jieba.cut(s, cut_all=cut_all)
+
 class TLM_Question:
     def __init__(self, req, hint, category, scope, tlm):
         self.tlm = tlm
@@ -332,7 +345,7 @@ class TLM_Article:
 
     def genWordlist(self):
         for sentence in self.sentences:
-            for tok in jieba.cut(sentence, cut_all=False):
+            for tok in segment(sentence):
                 if re.search(r"[   :!！\b\n\r\t.\"‘“”。，\]\[]", tok, re.UNICODE):
                     continue
                 self.words.append(tok)
@@ -344,7 +357,7 @@ class TLM_Article:
 
         for paragraph in self.paragraphs:
             paragraph = paragraph.strip()
-            for tok in jieba.cut(paragraph, cut_all=False):
+            for tok in segment(paragraph):
                 if re.search(r"[   :!！\b\n\r\t.\"‘“”。，\]\[]", tok, re.UNICODE):
                     continue
                 if not tok in self.words:
@@ -483,7 +496,7 @@ class TextLessonModel:
 
     def build_sentence(self, s):
         words = []
-        for tok in jieba.cut(s, cut_all=False):
+        for tok in segment(s):
             if re.search(r"[   :!！\b\n\r\t.\"‘“”。，\]\[]", tok, re.UNICODE):
                 continue
             words.append(tok)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+Hot/cold tiered dictionary
+
+A lesson only touches a few thousand entries, nearly all of them among the hottest
+words of allFreq, while most of allWords is the long tail of freq-list and x7-only
+words. openTieredDict() keeps the hot_size hottest words and idioms resident (the
+hot tier, inserted in allFreq rank order) and leaves the others in the on-disk
+DictStore (the cold tier).
+
+allWords and allIdioms become TieredEntries: a dict of the hot tier whose misses
+fall through to the cold tier. An entry looked up there is faulted in and stays in
+the hot dict for the rest of the run. Keys known to be in neither tier are
+remembered, so looking them up again doesn't query the store. "key in entries" only
+asks the store, it doesn't fault anything in. len() and iteration cover both tiers,
+the cold entries are decoded one by one as they come and not kept; iterating is a
+scan of the store. Chars, the headword trie and the pinyin index are small and stay
+whole.
+
+The hot tier is stored as its own snapshot per hot_size, the cold tier is the
+regular store (see openDictStore()). coldTierStats() reports how often the cold
+tier was hit or missed, to tune hot_size for a memory budget.
+
+"""
+
+import os
+import logging
+from MultiChineseDict import MultiChineseDict, ChWord, ChIdiom, CACHE_DIR
+from DictStore import DictStore, STORE_FILE, KIND_WORD, KIND_IDIOM, openDictStore
+
+#hottest words and idioms kept resident
+HOT_SIZE = 50000
+
+class TieredEntries(dict):
+    """ hot tier dict of one kind of entries, falling through to the cold tier """
+
+    def __init__(self, hot, store, kind):
+        dict.__init__(self, hot)
+        self.store = store
+        self.kind = kind
+        self.absent = set() #keys in neither tier
+        self.hits = 0 #entries faulted in from the cold tier
+        self.misses = 0 #lookups found in neither tier
+        #cold entries not resident, the hot tier is taken from the store
+        self.cold = store.count(kind) - dict.__len__(self)
+        return
+
+    def __reduce__(self):
+        #pickles as the plain dict of what is resident
+        return (dict, (dict(dict.items(self)),))
+
+    def fault(self, key):
+        """ the entry of key from the cold tier into the hot dict, None if there is none """
+        if key in self.absent:
+            self.misses += 1
+            return None
+        try:
+            if self.kind == KIND_WORD:
+                x = self.store.lookupWord(key)
+            else:
+                x = self.store.lookupIdiom(key)
+        except KeyError:
+            self.absent.add(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.cold -= 1
+        dict.__setitem__(self, key, x)
+        return x
+
+    def __missing__(self, key):
+        x = self.fault(key)
+        if x is None:
+            raise KeyError(key)
+        return x
+
+    def __contains__(self, key):
+        """ whether key is in either tier, without faulting it in """
+        if dict.__contains__(self, key):
+            return True
+        return not key in self.absent and self.store.has(self.kind, key)
+
+    def __setitem__(self, key, x):
+        if not dict.__contains__(self, key) and self.store.has(self.kind, key):
+            self.cold -= 1
+        self.absent.discard(key)
+        dict.__setitem__(self, key, x)
+
+    def __len__(self):
+        return dict.__len__(self) + self.cold
+
+    def __iter__(self):
+        return self.keys()
+
+    def keys(self):
+        yield from dict.keys(self)
+        yield from (k for k in self.store.keys(self.kind) if not dict.__contains__(self, k))
+
+    def items(self):
+        """ entries of both tiers, the cold ones decoded but not faulted in """
+        yield from dict.items(self)
+        yield from self.store.entries(self.kind, exclude=dict.keys(self))
+
+    def values(self):
+        return (x for dummy, x in self.items())
+
+    def get(self, key, default=None):
+        x = dict.get(self, key)
+        if x is None:
+            x = self.fault(key)
+        return default if x is None else x
+
+    def valuesUsing(self, ch):
+        """ entries of both tiers whose key contains ch, see MultiChineseDict.entriesUsing() """
+        hot = [x for w, x in dict.items(self) if ch in w]
+        return hot + self.store.entriesUsing(self.kind, ch, exclude=dict.keys(self))
+
+def hotSnapshotFile(hot_size):
+    return "%s/MultiChineseDict.hot%d.snapshot"%(CACHE_DIR, hot_size)
+
+def stubWord(cw):
+    stub = ChWord(cw.word)
+    stub.freq = cw.freq
+    return stub
+
+def stubIdiom(idm):
+    stub = ChIdiom(idm.idiom, {"word":idm.idiom, "pinyin":None, "explanation":None})
+    stub.freq = idm.freq
+    return stub
+
+def hotTier(md, hot_size):
+    """
+    MultiChineseDict holding only the hot_size hottest words/idioms of md, which it
+    takes over. The related words/idioms of chars beyond the hot tier are replaced by
+    stubs with name and freq, as DictStore.lookupChar() returns them.
+    """
+    ranked = [(x.freq, w, x) for d in (md.allWords, md.allIdioms)
+              for w, x in d.items() if x.freq > 0]
+    ranked.sort(key=lambda r: r[0])
+    hot = {id(x) for dummy, dummy, x in ranked[:hot_size]}
+
+    hmd = MultiChineseDict(load=False)
+    for k, v in md.snapshotState().items():
+        setattr(hmd, k, v)
+    hmd.allWords = {}
+    hmd.allIdioms = {}
+    #entries hold their own x7 explanations, the dict is only read by build()/prerender
+    hmd.x7ChWords = {}
+    for dummy, w, x in ranked[:hot_size]:
+        if x.kind == "idiom":
+            hmd.allIdioms[w] = x
+        else:
+            hmd.allWords[w] = x
+    for cc in hmd.allChars.values():
+        cc.words = [cw if id(cw) in hot else stubWord(cw) for cw in cc.words]
+        cc.idioms = [idm if id(idm) in hot else stubIdiom(idm) for idm in cc.idioms]
+    return hmd
+
+def openTieredDict(hot_size=HOT_SIZE, parallel=False):
+    """ MultiChineseDict with hot_size words/idioms resident and the rest on disk """
+    fn = hotSnapshotFile(hot_size)
+    md = MultiChineseDict(load=False)
+    store = None
+    if os.path.exists(STORE_FILE):
+        store = DictStore(STORE_FILE)
+        if not store.isFresh():
+            store.close()
+            store = None
+
+    if not store or not md.loadSnapshot(fn):
+        if store:
+            store.close()
+        full = MultiChineseDict(parallel=parallel)
+        store = openDictStore(STORE_FILE, full)
+        if store is full:
+            logging.warning("no dictionary store, keeping every entry in memory")
+            return full
+        md = hotTier(full, hot_size)
+        del full
+        md.saveSnapshot(fn)
+
+    logging.info("hot tier: %d 单词, %d 成语", len(md.allWords), len(md.allIdioms))
+    md.allWords = TieredEntries(md.allWords, store, KIND_WORD)
+    md.allIdioms = TieredEntries(md.allIdioms, store, KIND_IDIOM)
+    return md
+
+def coldTierStats(md):
+    """ {"words"/"idioms": {"resident", "hits", "misses"}}, None if md isn't tiered """
+    if not isinstance(md.allWords, TieredEntries):
+        return None
+    return {name:{"resident":dict.__len__(d), "hits":d.hits, "misses":d.misses}
+            for name, d in (("words", md.allWords), ("idioms", md.allIdioms))}
+
+if __name__ == "__main__":
+    logging.basicConfig(format='[TieredDict: %(asctime)s %(levelname)s] %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    tmd = openTieredDict()
+    tmd.lookup("天").pp()
+    print(coldTierStats(tmd))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+Aho-Corasick automaton over a set of words
+
+Finding which sentences use which words with s.find(word) for every pair scans each
+sentence once per word. WordMatcher builds one automaton from all the words and
+reads every sentence once, char by char, reporting all the words it contains:
+
+    goto    state => {char: next state}, the trie of the words
+    fail    state => longest proper suffix of the state that is also a trie state
+    out     state => words ending at the state, those of its fail chain included
+
+sentencesOf() gives the word => sentences map alc.py builds example sentences from.
+
+SubstringIndex answers the other way round, whether one word is part of any of a
+fixed set of texts (the dictation words of a lesson): a char => texts index narrows
+a query to the texts using its rarest char, instead of trying every text.
+
+"""
+
+from collections import deque
+
+class WordMatcher:
+    def __init__(self, words):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for w in words:
+            if w:
+                self.add(w)
+        self.link()
+        return
+
+    def add(self, word):
+        state = 0
+        for ch in word:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(())
+            state = nxt
+        self.out[state] = (word,)
+        return
+
+    def link(self):
+        """ fail links and merged outputs, breadth first so shorter states come first """
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                f = self.fail[state]
+                while f and not ch in self.goto[f]:
+                    f = self.fail[f]
+                f = self.goto[f].get(ch, 0)
+                self.fail[nxt] = f if f != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+                queue.append(nxt)
+        return
+
+    def findIn(self, text):
+        """ set of the words occurring in text """
+        goto = self.goto
+        fail = self.fail
+        out = self.out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and not ch in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def sentencesOf(self, sentences):
+        """ {word: {sentence: 0}} of the words found in sentences, in sentence order """
+        found = {}
+        for s in sentences:
+            for w in self.findIn(s):
+                found.setdefault(w, {})[s] = 0
+        return found
+
+class SubstringIndex:
+    def __init__(self, texts):
+        self.byChar = {} #char => texts using it
+        for t in texts:
+            for ch in set(t):
+                self.byChar.setdefault(ch, []).append(t)
+        return
+
+    def __contains__(self, word):
+        """ whether word is part of one of the texts, never for an empty word """
+        if not word:
+            return False
+        if len(word) == 1:
+            return word in self.byChar
+        texts = [self.byChar.get(ch) for ch in set(word)]
+        if not all(texts):
+            return False
+        return any(word in t for t in min(texts, key=len))
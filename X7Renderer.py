@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R0902,R1711,C0116,C0115
+
+"""
+HTML rendering of x7 explanations
+
+Notes of the same char/word are emitted more than once (word list and dictation
+output), so X7Renderer keeps the HTML of recently rendered headwords in a bounded
+LRU. The HTML of all headwords can also be rendered once and stored in the
+dictionary snapshot, see MultiChineseDict(prerender_x7=True).
+
+"""
+
+from collections import OrderedDict
+
+class X7Renderer:
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.cache = OrderedDict() #headword => html, least recently used first
+        self.rendered = {} #headword => html, prerendered, stored in snapshot
+        return
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["cache"] = OrderedDict()
+        return state
+
+    @staticmethod
+    def toHtml(x7e):
+        parts = []
+        num = 0
+        for x in x7e:
+            num = num+1
+            dummy, cx, pinyin, expl = x
+            assert len(x) == 4
+            if len(x7e)>1:
+                parts.append("<b>/～:%d/</b><br>"%num)
+            if pinyin:
+                parts.append("[%s] " % pinyin)
+            for c in cx:
+                parts.append("<%s>"%c)
+            parts.append("<br>")
+            for ex in expl:
+                parts.append("%s<br>"%ex)
+            parts.append("<br>")
+        return "".join(parts)
+
+    def render(self, headword, x7e):
+        """ html of x7 explanation x7e of headword """
+        if headword in self.rendered:
+            return self.rendered[headword]
+
+        html = self.cache.get(headword)
+        if html is not None:
+            self.cache.move_to_end(headword)
+            return html
+
+        html = X7Renderer.toHtml(x7e)
+        self.cache[headword] = html
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return html
+
+    def prerender(self, x7ChWords):
+        """ render all x7 explanations ahead, keyed by headword """
+        self.rendered = {w:X7Renderer.toHtml(x7e) for w, x7e in x7ChWords.items()}
+        return
@@ -13,11 +13,16 @@ import argparse
 import logging
 import hashlib
 from collections import OrderedDict
-import jieba
 from MultiChineseDict import MultiChineseDict
 from MultiChineseDict import ChWord
-from TextLessonModel import TextLessonModel
-from TTSService import GoogleTTS
+from TieredDict import openTieredDict, coldTierStats
+from WordMatcher import WordMatcher, SubstringIndex
+from SentenceAllocator import SentenceAllocator
+from TextLessonModel import TextLessonModel, segment, useDictServer
+from DictClient import connectDictServer
+from TTSService import TTSService
+from TTSPool import TTSPool
+from TTSCache import TTSCache
 
 import Config
 
@@ -52,13 +57,17 @@ class AnkiLearnChineseNotes:
         if not os.path.exists(self.tts_output_dir):
             logging.error("TTS output folder doesn't exist: %s", self.tts_output_dir)
 
-        self.tts_service = GoogleTTS(self.config)
+        self.tts_service = TTSService(self.config)
         assert os.path.exists(self.tts_output_dir)
+        self.tts_cache = TTSCache(self.tts_service, self.tts_output_dir)
+        self.tts_pool = TTSPool.fromConfig(self.tts_service, self.config, self.tts_cache)
 
         self.not_found_word_list = {}
         self.tags = None
         self.gen_list = False
         self.with_tts = False
+        self.autocorrect = False
+        self.headword_match = False
 
         #self.ignore_lst_fn = "%s/dicts/alc.ignore.lst"%SCRIPT_PATH
         self.ignore_lst = {}
@@ -67,11 +76,11 @@ class AnkiLearnChineseNotes:
         #    self.ignore_lst[l] = True
 
         self.all_word_to_sentence = {}
-        self.all_sentences_count = {}
+        self.sentence_allocator = SentenceAllocator()
         self.genArticle = True
 
         if not md:
-            self.md = MultiChineseDict()
+            self.md = openDict(args)
         else:
             self.md = md
 
@@ -103,34 +112,27 @@ class AnkiLearnChineseNotes:
             if not idiom in self.all_word_to_sentence:
                 worklist.append(idiom)
 
-        worklist = set(worklist)
-        values = list(self.all_word_to_sentence.values())
-        for word in worklist:
-            for sd in values:
-                for s in sd.keys():
-                    if s.find(word) != -1:
-                        if word in self.all_word_to_sentence:
-                            d = self.all_word_to_sentence[word]
-                            d[s] = 0
-                        else:
-                            self.all_word_to_sentence[word] = {s:0}
+        #every sentence once, in the order they are first met
+        sentences = {s:0 for sd in self.all_word_to_sentence.values() for s in sd}
+        self.all_word_to_sentence.update(WordMatcher(set(worklist)).sentencesOf(sentences))
         return
 
     def setWithTTS(self, with_tts):
         """ whether generate tts for notes """
         self.with_tts = with_tts
 
+    def setAutoCorrect(self, autocorrect):
+        """ whether to replace a word not found by the closest headword, see correctWord() """
+        self.autocorrect = autocorrect
+
+    def setHeadwordMatch(self, headword_match):
+        """ whether to split words not found by dictionary headwords instead of jieba """
+        self.headword_match = headword_match
+
     def setGenList(self, fn):
         """ whether to dump the word list to the given file """
         self.gen_list = fn
 
-    def sortFuncForSentenceCount(self, x):
-        """ sort function to make sure low hit sentences are first """
-        if not x in self.all_sentences_count:
-            return 0
-
-        return self.all_sentences_count[x]
-
     def getExampleSentence(self, word):
         """
             fetch one example sentence. It tend to pick up the one has not been
@@ -139,18 +141,7 @@ class AnkiLearnChineseNotes:
         if not word in self.all_word_to_sentence:
             return ""
 
-        sentences = self.all_word_to_sentence[word]
-        keys = list(sentences.keys())
-        keys.sort(key=self.sortFuncForSentenceCount, reverse=False)
-        ret = keys[0]
-
-        if ret in self.all_sentences_count:
-            count = self.all_sentences_count[ret]
-            self.all_sentences_count[ret] = count + 1
-        else:
-            self.all_sentences_count[ret] = 1
-
-        return ret
+        return self.sentence_allocator.pick(word, self.all_word_to_sentence[word])
 
     def get_ch_fields(self, ch):
         """ produce word note fields for a Chinese character """
@@ -160,7 +151,7 @@ class AnkiLearnChineseNotes:
 
         if cc.raw_js["x7explanation"]:
             expl = cc.raw_js["x7explanation"]
-            expl = MultiChineseDict.prettyX7Explanation(expl)
+            expl = self.md.renderX7(ch, expl)
         else:
             if expl:
                 expl = expl.replace("\r", "<br>")
@@ -210,7 +201,7 @@ class AnkiLearnChineseNotes:
         pinyin = []
         if cw.raw_js["x7explanation"]:
             x7expl = cw.raw_js["x7explanation"]
-            expl = MultiChineseDict.prettyX7Explanation(x7expl)
+            expl = self.md.renderX7(word, x7expl)
             for x in x7expl:
                 p = x[2]
                 if p:
@@ -257,7 +248,7 @@ class AnkiLearnChineseNotes:
         pinyin = idm.raw_js["pinyin"]
         if idm.raw_js["x7explanation"]:
             x7expl = idm.raw_js["x7explanation"]
-            expl = MultiChineseDict.prettyX7Explanation(x7expl)
+            expl = self.md.renderX7(idiom, x7expl)
             if not pinyin:
                 for x in x7expl:
                     p = x[2]
@@ -309,23 +300,32 @@ class AnkiLearnChineseNotes:
                 if not ch in handled_chars:
                     not_found_chars[ch] = True
 
+        for w, dummy in self.not_found_word_list.items():
+            if len(w) > 1:
+                logging.info("not found: %s, did you mean: %s", w,
+                             " ".join(x for x, dummy in self.md.suggest(w)) or "-")
+
         for ch, dummy in not_found_chars.items():
             if ch in self.md.allChars:
                 self.char_list[ch] = True
             else:
                 self.ignored_chars[ch] = True
 
-    def produceTTSOutput(self, word, just_check=None):
-        """ use TTS to produce audio of the word """
+    def ttsOutputFile(self, word):
+        """ absolute path of the audio of the word """
         assert len(word)<100
-        fn = "%s.mp3"%word
-        fn_abs = "%s/%s"%(self.tts_output_dir, fn)
-        if os.path.exists(fn_abs):
+        return "%s/%s.mp3"%(self.tts_output_dir, word)
+
+    def produceTTSOutput(self, word, just_check=None):
+        """ use TTS to produce audio of the word, just_check only tells whether it's needed """
+        fn_abs = self.ttsOutputFile(word)
+        if just_check:
+            return not self.tts_cache.probe("text", word, fn_abs)
+        if self.tts_cache.fetch("text", word, fn_abs):
             return False
 
         #use google tts
-        if not just_check:
-            self.tts_service.synthesize_chinese_text(word, fn_abs)
+        self.tts_pool.synthesize([("text", word, fn_abs)])
         return True
 
     def genAnkiImportTxt(self, fn, fn_articles=None, fn_clozes=None, fn_questions=None):
@@ -345,13 +345,10 @@ class AnkiLearnChineseNotes:
         if fn:
             fp = open(fn, "w")
 
+        #chars and words already part of a dictation word
+        dictation = SubstringIndex(self.tlm.dictation_words if self.tlm else ())
         for ch, dummy in self.char_list.items():
-            in_dictation = False
-            if self.tlm:
-                for dw in self.tlm.dictation_words:
-                    if dw.find(ch)>=0:
-                        in_dictation = True
-            if in_dictation:
+            if ch in dictation:
                 continue
             genlist.append(self.md.allChars[ch])
             chs = self.get_ch_fields(ch)
@@ -367,12 +364,7 @@ class AnkiLearnChineseNotes:
 
         ignore_words_without_explanation = []
         for word, dummy in self.word_list.items():
-            in_dictation = False
-            if self.tlm:
-                for dw in self.tlm.dictation_words:
-                    if dw.find(word)>=0:
-                        in_dictation = True
-            if in_dictation:
+            if word in dictation:
                 continue
             cw = self.md.allWords[word]
             if not cw.raw_js["explanation"] and not cw.raw_js["x7explanation"]:
@@ -402,18 +394,16 @@ class AnkiLearnChineseNotes:
                     if not word in self.md.allWords:
                         if len(word)>2:
                             print("Break due to not in dict: %s"%word)
-                            for tok in jieba.cut(word, cut_all=False):
+                            for tok in segment(word):
                                 print("TOK:%s"%tok)
                                 if not tok in self.md.allWords:
                                     if len(tok)>=1:
                                         js = {"ci":tok, "explanation":"n/a"}
-                                        wd = ChWord(tok, js)
-                                        self.md.allWords[tok] = wd
+                                        self.md.addWord(ChWord(tok, js))
                                 self.tlm.dictation_words[tok] = True
                         else:
                                 js = {"ci":word, "explanation":"n/a"}
-                                wd = ChWord(word, js)
-                                self.md.allWords[word] = wd
+                                self.md.addWord(ChWord(word, js))
                         continue
                     cw = self.md.allWords[word]
                     if not cw.raw_js["explanation"] and not cw.raw_js["x7explanation"]:
@@ -454,16 +444,18 @@ class AnkiLearnChineseNotes:
         if self.tlm and self.tlm.dictation_sentences:
             fn = fn + ".dictation_sentences"
             fp = open(fn, "w")
+            jobs = []
             for s, dummy in self.tlm.dictation_sentences.items():
                 anki = [s]
                 md5_s = hashlib.md5(s.encode("utf-8")).hexdigest()
                 anki.append("%s.mp3"%md5_s)
                 anki.append(self.tlm.tag)
                 fn_abs="%s/%s.mp3"%(self.tts_output_dir,md5_s)
-                self.tts_service.synthesize_chinese_text(s, fn_abs)
+                jobs.append(("text", s, fn_abs))
                 fp.write("\t".join(anki))
                 fp.write("\n")
             fp.close()
+            self.tts_pool.synthesize(jobs)
 
         if self.gen_list:
             fp = open(self.gen_list, "w")
@@ -477,8 +469,7 @@ class AnkiLearnChineseNotes:
                 if self.produceTTSOutput(x.getName(), just_check=True):
                     words_to_tts.append(x.getName())
             logging.info("producing tts audios for %d new words...", len(words_to_tts))
-            for x in words_to_tts:
-                self.produceTTSOutput(x)
+            self.tts_pool.synthesize(("text", x, self.ttsOutputFile(x)) for x in words_to_tts)
 
         if fn_articles:
             self.GenArticles(fn_articles)
@@ -488,6 +479,9 @@ class AnkiLearnChineseNotes:
 
         self.GenQuestions(fn_questions)
 
+        stats = coldTierStats(self.md)
+        if stats:
+            logging.info("cold tier: %s", stats)
         return
 
     def GenQuestions(self, fn_questions):
@@ -550,6 +544,7 @@ class AnkiLearnChineseNotes:
         logging.info("Generate article import file and article TTS to: %s", fn_articles)
 
         fp = open(fn_articles, "w")
+        jobs = []
         for title, am in self.tlm.articleModels.items():
             r = OrderedDict()
             r["uniqTitle"] = "%s.%s"%(self.tlm.lesson, title)
@@ -569,19 +564,20 @@ class AnkiLearnChineseNotes:
             ssml_fn = "%s/%s.%s.ssml"%(self.tts_output_dir, self.tlm.lesson, title)
             ssml = am.generateSSML()
             fn_abs = "%s/%s"%(self.tts_output_dir, audio_fn)
-            if not os.path.exists(fn_abs):
+            if not self.tts_cache.fetch("ssml", ssml, fn_abs):
                 logging.info("generate tts audio to: %s", audio_fn)
                 if self.args.keep_ssml:
                     print("keep ssml: %s"%ssml_fn)
                     fp_ssml = open(ssml_fn, "w")
                     fp_ssml.write(ssml)
                     fp_ssml.close()
-                self.tts_service.synthesize_chinese_ssml(ssml, fn_abs)
+                jobs.append(("ssml", ssml, fn_abs))
             r["tts"] = "[sound:%s]"%audio_fn
             r["tag"] = self.tlm.tag
             fp.write("\t".join(r.values()))
             fp.write("\n")
         fp.close()
+        self.tts_pool.synthesize(jobs)
 
         return
 
@@ -619,13 +615,35 @@ class AnkiLearnChineseNotes:
 
         return False
 
+    def correctWord(self, word):
+        """
+        the closest headword of the same length for a word not found (a typo or a
+        variant char), None if there is none
+        """
+        if len(word) < 2:
+            return None
+        for w, dummy in self.md.suggest(word):
+            if len(w) == len(word) and self.lookupWord(w):
+                logging.info("autocorrect %s -> %s", word, w)
+                return w
+        return None
+
+    def splitUnknownWord(self, word):
+        """ the words of a word not found, see splitWord() """
+        if self.headword_match:
+            return splitWord(word, self.md.headwords, self.lookupWord)
+        return splitWord(word)
+
     def processWordList(self, word_list, extend_ch=None, ecfl=None):
         """ process input word list"""
         logging.debug("processing word list: %s", word_list)
         for word in word_list:
             if not self.lookupWord(word):
-                if len(word)>2:
-                    for tok in jieba.cut(word, cut_all=True):
+                fixed = self.correctWord(word) if self.autocorrect else None
+                if fixed:
+                    self.addWord(fixed)
+                elif len(word)>2:
+                    for tok in self.splitUnknownWord(word):
                         if self.lookupWord(tok):
                             self.addWord(tok)
                         else:
@@ -637,16 +655,30 @@ class AnkiLearnChineseNotes:
 
         if extend_ch:
             for ch in self.char_list:
-                cc = self.md.allChars[ch]
-                for cw in cc.words[:extend_ch]:
-                    if ecfl and cw.freq>ecfl: #only
-                        continue
+                for cw in self.md.relatedWords(ch, extend_ch, ecfl):
                     if not cw.word in self.word_list and not cw.word in self.idiom_list:
                         assert len(cw.word) > 1
                         self.addWord(cw.word)
 
         return
 
+def splitWord(word, headwords=None, accept=None):
+    """
+    all words of word, for a word the dictionary doesn't know: jieba cut_all by
+    default. With headwords (a HeadwordTrie), every headword w with accept(w) at
+    every position instead, see HeadwordTrie.allMatches(): it finds dictionary words
+    jieba doesn't know and none that only jieba knows, so the notes differ.
+    """
+    if headwords is None:
+        return list(segment(word, cut_all=True))
+    return headwords.allMatches(word, accept)
+
+def openDict(args):
+    """ the dictionary, only the --hot_size hottest words/idioms resident if given """
+    if args.hot_size:
+        return openTieredDict(args.hot_size, parallel=args.parallel_load)
+    return MultiChineseDict(parallel=args.parallel_load, prerender_x7=args.prerender_x7)
+
 def GenAnkiFromString(s, args):
     """
         generate ANKI notes from a given string
@@ -654,7 +686,9 @@ def GenAnkiFromString(s, args):
     """
     alc_notes = AnkiLearnChineseNotes()
     alc_notes.setWithTTS(args.with_tts)
-    alc_notes.processWordList(list(jieba.cut(s, cut_all=False)),
+    alc_notes.setAutoCorrect(args.autocorrect)
+    alc_notes.setHeadwordMatch(args.headword_match)
+    alc_notes.processWordList(list(segment(s)),
             args.extend_char, args.extend_freq_limit)
     if args.gen_list:
         alc_notes.setGenList(args.gen_list)
@@ -669,10 +703,12 @@ def GenAnkiFromTextFile(fn, args):
     """
     alc_notes = AnkiLearnChineseNotes(args=args)
     alc_notes.setWithTTS(args.with_tts)
+    alc_notes.setAutoCorrect(args.autocorrect)
+    alc_notes.setHeadwordMatch(args.headword_match)
     fp = open(fn,"r")
     for line in fp.readlines():
         line = line.strip()
-        alc_notes.processWordList(list(jieba.cut(line, cut_all=False)),
+        alc_notes.processWordList(list(segment(line)),
                 args.extend_char, args.extend_freq_limit)
     if args.gen_list:
         alc_notes.setGenList(args.gen_list)
@@ -706,20 +742,19 @@ def GenAnkiFromOneYamlTLM(args, yaml_fn, md):
             for s in y.keys():
                 all_word_to_sentence[x][s] = 0
 
-    for w, dummy in tlm.wordsModel.items():
-        if not w in all_words:
-            all_words[w] = True
-            for s in all_sentences:
-                if s.find(w)>=0:
-                    if not w in all_word_to_sentence:
-                        all_word_to_sentence[w] = {}
-                    all_word_to_sentence[w][s] = 0
+    new_words = [w for w in tlm.wordsModel if not w in all_words]
+    for w in new_words:
+        all_words[w] = True
+    for w, sentences in WordMatcher(new_words).sentencesOf(all_sentences).items():
+        all_word_to_sentence.setdefault(w, {}).update(sentences)
 
     words = list(all_words.keys())
     words.sort(key=lambda x: countValues(x, all_word_to_sentence))
 
     alc_notes = AnkiLearnChineseNotes(tlm, args=args, md=md)
     alc_notes.setWithTTS(args.with_tts)
+    alc_notes.setAutoCorrect(args.autocorrect)
+    alc_notes.setHeadwordMatch(args.headword_match)
     alc_notes.setWordToSentenceDict(all_word_to_sentence)
     alc_notes.processWordList(words, extend_ch=None, ecfl=None)
     if args.gen_list:
@@ -745,13 +780,18 @@ def GenAnkiFromAllYamlTLM(args):
     """ genearte ANKI notes from all YAML files"""
     logging.info("processing YAML lesson model for all YAML files...")
     logging.info("-output is ignored when YAML TLM file is input.")
-    md = MultiChineseDict()
+    md = openDict(args)
     for yaml_fn in args.input_yaml_tlm:
         GenAnkiFromOneYamlTLM(args, yaml_fn, md)
     return
 
 def cli(args):
     """ entry of program CLI """
+    client = connectDictServer()
+    if client:
+        logging.info("segment text by the dictionary daemon")
+        useDictServer(client)
+
     if args.tags:
         if not args.tags.startswith("#"):
             logging.error("Suggest use #<something> as tag name for better orgnization")
@@ -785,6 +825,16 @@ def main():
             help="Put N high frequency words/idioms that uses the char into word list")
     parser.add_argument('-ecfl', '--extend_freq_limit', type=int,
             help="only extend with words that has high freqency than the limit")
+    parser.add_argument('-pl', '--parallel_load', action='store_true',
+            help="decode dictionary sources in parallel when the dictionary has to be built")
+    parser.add_argument('-px', '--prerender_x7', action='store_true',
+            help="render HTML of all x7 explanations once and keep it in the dictionary snapshot")
+    parser.add_argument('-hs', '--hot_size', type=int,
+            help="keep only the N hottest words/idioms in memory, look up others on disk")
+    parser.add_argument('-ac', '--autocorrect', action='store_true',
+            help="replace words not found by the closest dictionary word of the same length")
+    parser.add_argument('-hm', '--headword_match', action='store_true',
+            help="split words not found by dictionary headwords instead of jieba cut_all")
     parser.add_argument('-gl', '--gen_list',
             help="dump the word list to specified file")
     parser.add_argument('-t', '--tags',
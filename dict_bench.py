@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R1711,R0914
+
+'''
+dict_bench.py benchmarks building and querying MultiChineseDict.
+
+It times every build phase (MultiChineseDict.BUILD_LAYERS), loading the snapshot,
+single and batch lookups, related word/idiom queries and the dictation word check of
+alc.py. Every benchmark runs --warmup times unmeasured and then --repeat times; min,
+median and mean of the runs are reported. The peak memory of a build and of a
+snapshot load is taken with tracemalloc in a separate run, as tracing slows
+everything down.
+
+By default the dictionary is generated: syntheticSources() makes chars, words,
+idioms, x7 explanations and a frequency list shaped like dicts/, with SCALE_1X
+entries times --scale. "-s 1 5 20" shows how the phases scale. --dicts benchmarks
+the real sources under dicts/ instead, including decoding them.
+
+Results are written as JSON with -o, and --compare prints the ratio to the results
+of another run, e.g. of an older commit:
+
+    ./dict_bench.py -s 1 5 -o new.json --compare old.json
+
+'''
+
+import os
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import logging
+import platform
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+import MultiChineseDict
+from FreqTable import FreqTable
+from WordMatcher import SubstringIndex
+
+#entries of a 1x synthetic dictionary, about the size of dicts/
+SCALE_1X = {"chars":16000, "ci":260000, "idioms":31000, "x7":63000, "freq":220000}
+
+#chars the synthetic headwords are made of, CJK unified ideographs and extension A
+CJK_CHARS = [chr(c) for c in range(0x4E00, 0xA000)] + [chr(c) for c in range(0x3400, 0x4DC0)]
+
+SYLLABLES = ["mā", "má", "mǎ", "mà", "tiān", "qì", "shì", "hǎo", "rén", "dà", "xiǎo",
+             "zhōng", "guó", "lǜ", "nǚ", "xué", "shēng", "yī", "èr", "sān", "kāi", "xīn",
+             "ài", "bù", "lái", "qù", "shuō", "huà", "chī", "fàn", "shuǐ", "huǒ"]
+
+POS = ["名", "动", "形", "副", "书", "方"]
+
+NUM_QUERIES = 20000
+
+#dictation words of the synthetic lesson and notes checked against them
+NUM_DICTATION = 3000
+NUM_NOTES = 1000
+
+def syntheticSources(scale=1, seed=0):
+    """
+    SOURCE_FILES attribute => data of a generated dictionary with SCALE_1X entries
+    times scale. Char popularity is Zipf like, so some chars have many related words
+    as in real data. The same scale and seed always give the same dictionary.
+    """
+    rng = random.Random(seed)
+    num = {k:int(v*scale) for k, v in SCALE_1X.items()}
+    chars = rng.sample(CJK_CHARS, min(num["chars"], len(CJK_CHARS)))
+    cum_weights = []
+    total = 0.0
+    for i in range(len(chars)):
+        total += 1.0/(i + 1)
+        cum_weights.append(total)
+
+    def pinyin(n):
+        return " ".join(rng.choice(SYLLABLES) for dummy in range(n))
+
+    def newWords(n, lengths, seen):
+        words = []
+        while len(words) < n:
+            length = rng.choice(lengths)
+            w = "".join(rng.choices(chars, cum_weights=cum_weights, k=length))
+            if not w in seen:
+                seen.add(w)
+                words.append(w)
+        return words
+
+    seen = set(chars)
+    ci = newWords(num["ci"], (2, 2, 2, 3, 3, 4), seen)
+    idioms = newWords(num["idioms"], (4,), seen)
+    freq_only = newWords(num["freq"]//10, (2, 3), seen)
+    x7_only = newWords(num["x7"]//20, (2, 3), seen)
+
+    jsWord = [{"word":c, "oldword":c, "strokes":str(rng.randint(1, 30)), "pinyin":pinyin(1),
+               "radicals":rng.choice(chars), "explanation":"释义 %s"%c, "more":""}
+              for c in chars]
+    jsCi = [{"ci":w, "explanation":"释义 %s"%w} for w in ci]
+    jsIdiom = [{"word":w, "pinyin":pinyin(4), "explanation":"释义 %s"%w,
+                "derivation":"", "example":"", "abbreviation":""} for w in idioms]
+    jsXiehouyu = [{"riddle":"".join(rng.choices(chars, k=6)), "answer":w}
+                  for w in rng.sample(ci, min(len(ci), num["idioms"]//2))]
+
+    x7ChWords = {}
+    x7_keys = (rng.sample(chars, len(chars)*3//4) + rng.sample(ci, num["x7"]//2)
+               + rng.sample(idioms, num["x7"]//10) + x7_only)
+    for w in x7_keys:
+        x7ChWords[w] = [[w, [rng.choice(POS)], pinyin(len(w)), ["❶释义 %s"%w, "❷例句～"]]
+                        for dummy in range(rng.choice((1, 1, 1, 2)))]
+
+    #all chars, most words and some idioms have a count, hottest first
+    ranked = (chars + rng.sample(ci, min(len(ci), num["freq"]*6//10))
+              + rng.sample(idioms, num["idioms"]//3) + freq_only)
+    rng.shuffle(ranked)
+    allFreq = FreqTable()
+    for rank, w in enumerate(ranked, 1):
+        allFreq.add(w, 10**8//rank, rank)
+
+    return {"allFreq":allFreq, "x7ChWords":x7ChWords, "jsWord":jsWord, "jsCi":jsCi,
+            "jsIdiom":jsIdiom, "jsXiehouyu":jsXiehouyu}
+
+def realSources():
+    """ the sources under dicts/, with the seconds it took to decode each of them """
+    sources = {}
+    seconds = {}
+    for name in MultiChineseDict.BUILD_SOURCES:
+        dummy, data, t = MultiChineseDict.loadSource(name)
+        sources[name] = data
+        seconds["load.%s"%name] = t
+    return sources, seconds
+
+def newDict(sources):
+    """
+    MultiChineseDict on a deep copy of sources: the build phases change the sources
+    they read, so every run starts from the same data
+    """
+    md = MultiChineseDict.MultiChineseDict(load=False)
+    for name, data in sources.items():
+        setattr(md, name, copy.deepcopy(data))
+    return md
+
+def buildPhases(sources):
+    """ built MultiChineseDict, {"build.<phase>": seconds} """
+    md = newDict(sources)
+    seconds = {}
+    for name, dummy, dummy in MultiChineseDict.BUILD_LAYERS:
+        start = time.perf_counter()
+        getattr(md, name)()
+        seconds["build.%s"%name] = time.perf_counter() - start
+    seconds["build.total"] = sum(seconds.values())
+    md.releaseSources()
+    return md, seconds
+
+def queryKeys(md, num, seed=0):
+    """ num lookup keys, 9 of 10 of them headwords """
+    rng = random.Random(seed)
+    headwords = md.headwords.keys
+    keys = []
+    for i in range(num):
+        if i % 10 == 9:
+            keys.append("".join(rng.choices(CJK_CHARS, k=rng.choice((1, 2, 3)))))
+        else:
+            keys.append(rng.choice(headwords))
+    return keys
+
+def queryPhases(md, keys, chars):
+    """ {"query.<kind>": seconds per query} """
+    seconds = {}
+
+    start = time.perf_counter()
+    for s in keys:
+        try:
+            md.lookup(s)
+        except KeyError:
+            pass
+    seconds["query.lookup"] = (time.perf_counter() - start)/len(keys)
+
+    start = time.perf_counter()
+    md.lookup_many(keys)
+    seconds["query.lookup_many"] = (time.perf_counter() - start)/len(keys)
+
+    start = time.perf_counter()
+    for ch in chars:
+        md.relatedWords(ch)
+        md.relatedIdioms(ch)
+    seconds["query.related"] = (time.perf_counter() - start)/len(chars)
+
+    #more than a char keeps, the full lists are materialized
+    n = MultiChineseDict.RELATED_TOP_K*4
+    start = time.perf_counter()
+    for ch in chars[:len(chars)//20 or 1]:
+        md.relatedWords(ch, n)
+        md.relatedIdioms(ch, n)
+    seconds["query.related_full"] = (time.perf_counter() - start)/(len(chars)//20 or 1)
+    return seconds
+
+def dictationPhases(md, keys, seed=0):
+    """
+    {"query.dictation_<kind>": seconds per note} of skipping the notes already part of
+    a dictation word (alc.py genAnkiImportTxt()), by trying every dictation word and
+    with a SubstringIndex
+    """
+    rng = random.Random(seed)
+    dictation = rng.sample([w for w in md.headwords.keys if len(w) > 1], NUM_DICTATION)
+    notes = keys[:NUM_NOTES]
+    seconds = {}
+
+    start = time.perf_counter()
+    scanned = [w for w in notes if any(dw.find(w) >= 0 for dw in dictation)]
+    seconds["query.dictation_scan"] = (time.perf_counter() - start)/len(notes)
+
+    start = time.perf_counter()
+    index = SubstringIndex(dictation)
+    indexed = [w for w in notes if w in index]
+    seconds["query.dictation_index"] = (time.perf_counter() - start)/len(notes)
+    assert scanned == indexed
+    return seconds
+
+def snapshotLoad(fn):
+    md = MultiChineseDict.MultiChineseDict(load=False)
+    start = time.perf_counter()
+    if not md.loadSnapshot(fn):
+        raise RuntimeError("can't load snapshot %s"%fn)
+    return {"snapshot.load":time.perf_counter() - start}
+
+def peakMemory(sources, snapshot_fn):
+    """
+    {"peak.<phase>": bytes} traced by tracemalloc. Tracing starts before the sources
+    are copied, so the build peak includes them.
+    """
+    peaks = {}
+    tracemalloc.start()
+    md, dummy = buildPhases(sources)
+    peaks["peak.build"] = tracemalloc.get_traced_memory()[1]
+    del md
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    md = MultiChineseDict.MultiChineseDict(load=False)
+    md.loadSnapshot(snapshot_fn)
+    peaks["peak.snapshot_load"] = tracemalloc.get_traced_memory()[1]
+    del md
+    tracemalloc.stop()
+    return peaks
+
+def summarize(runs):
+    """ {"name": {"runs", "min", "median", "mean"}} of a list of {name: value} """
+    result = {}
+    for name in runs[0]:
+        values = [r[name] for r in runs]
+        result[name] = {"runs":values, "min":min(values),
+                        "median":statistics.median(values), "mean":statistics.mean(values)}
+    return result
+
+def benchmark(label, sources, args, extra=None):
+    """ results of all benchmarks on sources, see summarize() """
+    logging.info("%s: %s", label, ", ".join("%s %d"%(k, len(v)) for k, v in sources.items()))
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_fn = os.path.join(tmp_dir, "bench.snapshot")
+        for i in range(args.warmup + args.repeat):
+            md, seconds = buildPhases(sources)
+            if i == 0:
+                keys = queryKeys(md, NUM_QUERIES)
+                chars = [w for w in keys if len(w) == 1 and w in md.allChars]
+                md.saveSnapshot(snapshot_fn)
+            seconds.update(queryPhases(md, keys, chars))
+            seconds.update(dictationPhases(md, keys))
+            del md
+            seconds.update(snapshotLoad(snapshot_fn))
+            if extra:
+                seconds.update(extra)
+            if i >= args.warmup:
+                runs.append(seconds)
+            logging.info("%s run %d%s: build %.2fs", label, i + 1,
+                    " (warm-up)" if i < args.warmup else "", seconds["build.total"])
+        result = summarize(runs)
+        if not args.no_memory:
+            for name, peak in peakMemory(sources, snapshot_fn).items():
+                result[name] = {"runs":[peak], "min":peak, "median":peak, "mean":peak}
+    return result
+
+def gitRevision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                cwd=MultiChineseDict.SCRIPT_PATH, capture_output=True, text=True,
+                check=True).stdout.strip()
+    except Exception:
+        return None
+
+def formatValue(name, value):
+    if name.startswith("peak."):
+        return "%.1f MB"%(value/2**20)
+    if name.startswith("query."):
+        return "%.2f us"%(value*1e6)
+    return "%.3f s"%value
+
+def printResults(results, baseline=None):
+    for label, result in results.items():
+        print("== %s"%label)
+        base = (baseline or {}).get(label, {})
+        for name, r in result.items():
+            line = "  %-40s %12s"%(name, formatValue(name, r["median"]))
+            if name in base and base[name]["median"]:
+                line += "  x%.2f"%(r["median"]/base[name]["median"])
+            print(line)
+    return
+
+def main():
+    """ program main entry """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(prog=os.path.basename(__file__)
+            , description="dict_bench.py: benchmark dictionary build and lookup")
+    parser.add_argument('-d', '--debug', action='store_true', help="debug mode")
+    parser.add_argument('-s', '--scale', type=float, nargs='+', default=[1],
+            help="sizes of the synthetic dictionaries, in multiples of dicts/, default is 1")
+    parser.add_argument('--dicts', action='store_true',
+            help="benchmark the sources under dicts/ instead of synthetic ones")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+            help="measured runs of each benchmark, default is 3")
+    parser.add_argument('-w', '--warmup', type=int, default=1,
+            help="unmeasured runs before them, default is 1")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the synthetic dictionaries")
+    parser.add_argument('-nm', '--no_memory', action='store_true',
+            help="skip the tracemalloc runs")
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare to")
+
+    args = parser.parse_args()
+
+    if args.debug:
+        logging.basicConfig(format='[dict_bench.py: %(asctime)s %(levelname)s] %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S', level=logging.DEBUG)
+    else:
+        logging.basicConfig(format='[dict_bench.py: %(asctime)s %(levelname)s] %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+        #the per phase logs of MultiChineseDict drown the progress
+        logging.getLogger().addFilter(lambda record: record.filename == "dict_bench.py")
+
+    results = {}
+    if args.dicts:
+        sources, seconds = realSources()
+        results["dicts"] = benchmark("dicts", sources, args, seconds)
+    else:
+        for scale in args.scale:
+            label = "%gx"%scale
+            sources = syntheticSources(scale, args.seed)
+            results[label] = benchmark(label, sources, args)
+            del sources
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as fp:
+            baseline = json.load(fp)["results"]
+    printResults(results, baseline)
+
+    if args.output:
+        report = {"revision":gitRevision(), "python":platform.python_version(),
+                  "time":time.strftime("%Y-%m-%d %H:%M:%S"), "argv":sys.argv[1:],
+                  "repeat":args.repeat, "warmup":args.warmup, "results":results}
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=1)
+    return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R1711
+
+'''
+dict_build.py rebuilds the dictionary snapshot after files under dicts/ are changed.
+
+By default the build is incremental: the state left by a build phase is cached
+under cache/layers/, keyed by the inputs of the phase and its upstream phases (see
+MultiChineseDict.BUILD_LAYERS), and only the phases after the deepest unchanged one
+are run. A checkpoint costs about as much as the phases it saves, so a build only
+writes the one before attaching x7 explanations and the one it would have started
+from itself, e.g. after the idioms once a ci file changed. Patching x7 explanations only reruns attaching them and the indexes; a new
+ci or idiom file reruns the phases from the words or the idioms on. A new frequency
+list still reruns everything, all phases rank entries by it.
+
+'''
+
+import os
+import time
+import argparse
+import logging
+import MultiChineseDict
+
+def main():
+    """ program main entry """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(prog=os.path.basename(__file__)
+            , description="dict_build.py: rebuild the dictionary snapshot")
+    parser.add_argument('-d', '--debug', action='store_true', help="debug mode")
+    parser.add_argument('-f', '--force', action='store_true',
+            help="rebuild even if the snapshot is up to date")
+    parser.add_argument('--full', action='store_true',
+            help="run all build phases, don't use or write the layer cache")
+    parser.add_argument('-pl', '--parallel_load', action='store_true',
+            help="decode dictionary sources in parallel")
+    parser.add_argument('-px', '--prerender_x7', action='store_true',
+            help="render the HTML of all x7 explanations into the snapshot")
+    parser.add_argument('-l', '--layers', action='store_true',
+            help="only print the build phases of the snapshot and their keys")
+
+    args = parser.parse_args()
+
+    if args.debug:
+        logging.basicConfig(format='[dict_build.py: %(asctime)s %(levelname)s] %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S', level=logging.DEBUG)
+    else:
+        logging.basicConfig(format='[dict_build.py: %(asctime)s %(levelname)s] %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    if not args.layers:
+        start = time.time()
+        if args.force and os.path.exists(MultiChineseDict.SNAPSHOT_FILE):
+            os.remove(MultiChineseDict.SNAPSHOT_FILE)
+        MultiChineseDict.MultiChineseDict(parallel=args.parallel_load,
+                prerender_x7=args.prerender_x7, incremental=not args.full)
+        logging.info("snapshot is up to date in %.2fs", time.time() - start)
+
+    for name, inputs, upstream, key in MultiChineseDict.snapshotLayers():
+        print("%s %-26s inputs: %s, upstream: %s"%(key[:12], name,
+                ", ".join(inputs) or "-", ", ".join(upstream) or "-"))
+    return
+
+if __name__ == "__main__":
+    main()
@@ -5,25 +5,105 @@
 '''
 dict_lookup.py is a separate command line tool to look up a character/word/idiom from dictionary.
 
-The result will be printed on screen.
+The result will be printed on screen. With --input, words are read from a file (or
+stdin for "-") and looked up in batches, one JSON line or TSV row per word.
 
-This script is not designed for quick lookup. It takes some time to load all the dictionaries.
+When the dictionary daemon (dict_server.py) is running, all queries are sent to it.
+Otherwise lookups go through the on-disk DictStore, which only decodes the requested
+entry, and --prefix/--pinyin/--xiehouyu/--radical/--strokes load the dictionary
+snapshot. The first run
+after dicts/ changes takes some time to build the dictionary and the store.
 
 '''
 
 import os
+import sys
+import json
 import argparse
 import logging
 import MultiChineseDict
+import DictStore
+import DictClient
+
+BATCH_SIZE=1000
+
+def summarize(key, x):
+    """ flat record of a lookup result for --input output """
+    if not x:
+        return {"key":key, "found":False, "kind":"", "freq":0, "pinyin":"", "explanation":""}
+
+    readings = []
+    for p in x.readings():
+        if not p in readings:
+            readings.append(p)
+    if x.raw_js["x7explanation"]:
+        expl = " / ".join(ex for sense in x.raw_js["x7explanation"] for ex in sense[3])
+    else:
+        expl = x.raw_js["explanation"] or ""
+    return {"key":key, "found":True, "kind":x.kind, "freq":x.freq,
+            "pinyin":", ".join(readings), "explanation":" ".join(expl.split())}
+
+def lookupStream(md, fp, fmt, out=sys.stdout):
+    """ look up all whitespace separated words of fp, BATCH_SIZE at a time """
+    fields = ["key", "found", "kind", "freq", "pinyin", "explanation"]
+    if fmt == "tsv":
+        out.write("\t".join(fields) + "\n")
+
+    def flush(batch):
+        for key, x in md.lookup_many(batch):
+            r = summarize(key, x)
+            if fmt == "tsv":
+                out.write("\t".join(str(int(r[f]) if f == "found" else r[f]) for f in fields))
+                out.write("\n")
+            else:
+                out.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    batch = []
+    for line in fp:
+        batch.extend(line.split())
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return
 
 def main():
     """ program main entry """
     parser: argparse.ArgumentParser = argparse.ArgumentParser(prog=os.path.basename(__file__)
             , description="dict_lookup.py: lookup word from dictionary")
     parser.add_argument('-d', '--debug', action='store_true', help="debug mode")
-    parser.add_argument('word',  help='the word need to be looked up')
+    parser.add_argument('-ns', '--no_snapshot', action='store_true',
+            help="build from dicts/ instead of using the snapshot and the store")
+    parser.add_argument('-p', '--prefix', action='store_true',
+            help="list the hottest words starting with the word instead")
+    parser.add_argument('-py', '--pinyin', action='store_true',
+            help="the word is pinyin (shi, shì or shi4), list chars/words read that way")
+    parser.add_argument('-x', '--xiehouyu', action='store_true',
+            help="list 歇后语 whose riddle or answer contains the word instead")
+    parser.add_argument('-r', '--radical',
+            help="list chars with the radical instead, hottest first")
+    parser.add_argument('-s', '--strokes',
+            help="list chars with N or N-M strokes instead, can be combined with --radical")
+    parser.add_argument('-fl', '--freq_limit', type=int,
+            help="only list chars of --radical/--strokes ranked within the limit")
+    parser.add_argument('-n', '--num', type=int, default=20,
+            help="number of words listed by --prefix/--pinyin/--xiehouyu/--radical/--strokes,"
+                 " default is 20")
+    parser.add_argument('--page', type=int, default=0,
+            help="page of --pinyin/--radical/--strokes results to list, starting from 0")
+    parser.add_argument('-i', '--input',
+            help="look up all words in the file, - for stdin")
+    parser.add_argument('-f', '--format', choices=["json", "tsv"], default="json",
+            help="output format of --input, default is json lines")
+    parser.add_argument('word', nargs='?', help='the word need to be looked up')
 
     args = parser.parse_args()
+    if not args.word and not args.input and not args.radical and not args.strokes:
+        parser.error("either word, --input, --radical or --strokes is required")
+    for flag in ("prefix", "pinyin", "xiehouyu"):
+        if getattr(args, flag) and not args.word:
+            parser.error("--%s requires a word"%flag)
 
     if args.debug:
         logging.basicConfig(format='[dict_lookup.py: %(asctime)s %(levelname)s] %(message)s',
@@ -31,7 +111,72 @@ def main():
     else:
         logging.basicConfig(format='[dict_lookup.py: %(asctime)s %(levelname)s] %(message)s',
                             datefmt='%Y-%m-%d %H:%M:%S', level=logging.ERROR)
-    md = MultiChineseDict.MultiChineseDict()
+    client = None
+    if not args.no_snapshot:
+        client = DictClient.connectDictServer()
+
+    if args.prefix:
+        if client:
+            entries = [x for dummy, x in client.lookup_many(client.prefix(args.word, args.num))]
+        else:
+            md = MultiChineseDict.MultiChineseDict(snapshot=not args.no_snapshot)
+            entries = [md.lookup(w) for w in md.headwords.withPrefix(args.word, args.num)]
+        for x in entries:
+            print("%s %s"%(x.getName(), MultiChineseDict.ChChar.num2star(x.freq)))
+        return
+
+    if args.pinyin:
+        if client:
+            total, words = client.pinyin(args.word, args.page, args.num)
+            entries = [x for dummy, x in client.lookup_many(words)]
+        else:
+            md = MultiChineseDict.MultiChineseDict(snapshot=not args.no_snapshot)
+            total, entries = md.lookupPinyin(args.word, args.page, args.num)
+        print("%d entries read as %s, page %d:"%(total, args.word, args.page))
+        for x in entries:
+            print("%s %s"%(x.getName(), MultiChineseDict.ChChar.num2star(x.freq)))
+        return
+
+    if args.radical or args.strokes:
+        if client:
+            total, chars = client.chars(args.radical, args.strokes, args.freq_limit,
+                                        args.page, args.num)
+            entries = [x for dummy, x in client.lookup_many(chars)]
+        else:
+            md = MultiChineseDict.MultiChineseDict(snapshot=not args.no_snapshot)
+            total, entries = md.lookupChars(args.radical, args.strokes, args.freq_limit,
+                                            args.page, args.num)
+        print("%d chars, page %d:"%(total, args.page))
+        for x in entries:
+            print("%s %s %s %s"%(x.char, x.raw_js["radicals"], x.raw_js["strokes"],
+                                 MultiChineseDict.ChChar.num2star(x.freq)))
+        return
+
+    if args.xiehouyu:
+        if client:
+            found = client.xiehouyu(args.word, args.num)
+        else:
+            md = MultiChineseDict.MultiChineseDict(snapshot=not args.no_snapshot)
+            found = md.lookupXiehouyu(args.word, args.num)
+        for x in found:
+            print("%s —— %s"%(x["riddle"], x["answer"]))
+        return
+
+    if client:
+        md = client
+    elif args.no_snapshot:
+        md = MultiChineseDict.MultiChineseDict(snapshot=False)
+    else:
+        md = DictStore.openDictStore()
+
+    if args.input:
+        if args.input == "-":
+            lookupStream(md, sys.stdin, args.format)
+        else:
+            with open(args.input, "r") as fp:
+                lookupStream(md, fp, args.format)
+        return
+
     md.lookup(args.word).pp()
     return
 
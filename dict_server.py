@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0703,R1711
+
+'''
+dict_server.py is a long running daemon that loads MultiChineseDict and jieba once and
+serves lookups to other tools over a Unix domain socket, see DictClient.py for the
+protocol.
+
+dict_lookup.py, tlm_build.py and alc.py use the daemon when it is running and load
+what they need in process otherwise.
+
+'''
+
+import os
+import sys
+import json
+import signal
+import argparse
+import logging
+import socketserver
+import jieba
+import MultiChineseDict
+import DictClient
+
+logging.getLogger("jieba").setLevel(logging.ERROR)
+
+class DictService:
+    """ ops of the protocol, each takes the request dict and returns a JSON friendly result """
+
+    #params an op can't do without, the others have defaults
+    REQUIRED = {"lookup":("key",), "lookup_many":("keys",), "segment":("text",),
+                "related":("key",), "prefix":("key",), "xiehouyu":("key",), "pinyin":("key",)}
+
+    def __init__(self, md):
+        self.md = md
+        return
+
+    def op_ping(self, dummy):
+        return "pong"
+
+    def op_lookup(self, req):
+        return self.md.lookup(req["key"]).asDict()
+
+    def op_lookup_many(self, req):
+        return [x.asDict() if x else None for dummy, x in self.md.lookup_many(req["keys"])]
+
+    def op_segment(self, req):
+        return list(jieba.cut(req["text"], cut_all=req.get("cut_all", False)))
+
+    def op_related(self, req):
+        ch = req["key"]
+        n = req.get("n")
+        freq_limit = req.get("freq_limit")
+        return {"words":[(cw.word, cw.freq) for cw in self.md.relatedWords(ch, n, freq_limit)],
+                "idioms":[(idm.idiom, idm.freq)
+                          for idm in self.md.relatedIdioms(ch, n, freq_limit)]}
+
+    def op_prefix(self, req):
+        return self.md.headwords.withPrefix(req["key"], req.get("n", 20))
+
+    def op_xiehouyu(self, req):
+        return self.md.lookupXiehouyu(req["key"], req.get("n"))
+
+    def op_pinyin(self, req):
+        total, words = self.md.pinyin.page(req["key"], req.get("page", 0),
+                                           req.get("page_size", 20))
+        return {"total":total, "words":words}
+
+    def op_chars(self, req):
+        total, chars = self.md.chars.page(req.get("radical"), req.get("strokes"),
+                                          req.get("freq_limit"), req.get("page", 0),
+                                          req.get("page_size", 20))
+        return {"total":total, "chars":chars}
+
+    def handle(self, line):
+        """ one request line => one response dict """
+        try:
+            req = json.loads(line)
+            if not isinstance(req, dict):
+                return {"ok":False, "error":"bad_request", "message":"not a JSON object"}
+            op = getattr(self, "op_%s"%req.get("op"), None)
+            if not op:
+                return {"ok":False, "error":"bad_request", "message":"unknown op: %s"%req.get("op")}
+            missing = [p for p in self.REQUIRED.get(req["op"], ()) if not p in req]
+            if missing:
+                return {"ok":False, "error":"bad_request",
+                        "message":"%s needs %s"%(req["op"], ", ".join(missing))}
+            return {"ok":True, "result":op(req)}
+        except KeyError as e:
+            return {"ok":False, "error":"not_found", "message":str(e.args[0])}
+        except Exception as e:
+            logging.exception("failed request: %s", line)
+            return {"ok":False, "error":"bad_request", "message":str(e)}
+
+class DictRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.service.handle(line)
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+class DictServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, fn, service):
+        self.service = service
+        socketserver.ThreadingUnixStreamServer.__init__(self, fn, DictRequestHandler)
+
+def main():
+    """ program main entry """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(prog=os.path.basename(__file__)
+            , description="dict_server.py: dictionary daemon")
+    parser.add_argument('-d', '--debug', action='store_true', help="debug mode")
+    parser.add_argument('-s', '--socket', default=DictClient.SOCKET_FILE,
+            help="Unix socket to listen on, default is %s"%DictClient.SOCKET_FILE)
+
+    args = parser.parse_args()
+
+    if args.debug:
+        logging.basicConfig(format='[dict_server.py: %(asctime)s %(levelname)s] %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S', level=logging.DEBUG)
+    else:
+        logging.basicConfig(format='[dict_server.py: %(asctime)s %(levelname)s] %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    client = DictClient.connectDictServer(args.socket)
+    if client:
+        client.close()
+        logging.error("dictionary daemon is already running at %s", args.socket)
+        sys.exit(1)
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+    os.makedirs(os.path.dirname(os.path.abspath(args.socket)), exist_ok=True)
+
+    md = MultiChineseDict.MultiChineseDict()
+    jieba.initialize()
+
+    signal.signal(signal.SIGTERM, lambda *dummy: sys.exit(0))
+    server = DictServer(args.socket, DictService(md))
+    logging.info("serving dictionary at %s", args.socket)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(args.socket)
+    return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import os
+import sys
+import pytest
+
+#the modules live at the top of the repo, next to the scripts using them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+#pylint: disable=C0413
+from MultiChineseDict import MultiChineseDict
+from FreqTable import FreqTable
+
+@pytest.fixture(name="built_dict")
+def fixture_built_dict():
+    """ a small built MultiChineseDict: 好 and 人, three words and an idiom, for each test """
+    md = MultiChineseDict(load=False)
+    md.jsWord = [{"word":c, "oldword":c, "strokes":"6", "pinyin":py, "radicals":"女",
+                  "explanation":"", "more":""} for c, py in (("好", "hǎo"), ("人", "rén"))]
+    md.jsCi = [{"ci":w, "explanation":"释义"} for w in ("好人", "好事", "人人")]
+    md.jsIdiom = [{"word":"好人好事", "pinyin":"hǎo rén hǎo shì", "explanation":"",
+                   "derivation":"", "example":"", "abbreviation":""}]
+    md.x7ChWords = {"好人":[["好人", ["名"], "hǎorén", ["❶品行好的人"]]]}
+    md.allFreq = FreqTable()
+    for rank, w in enumerate(("好", "人", "好人", "人人", "好人好事"), 1):
+        md.allFreq.add(w, 1000//rank, rank)
+    md.build()
+    return md
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import random
+from types import SimpleNamespace
+from CharIndex import CharIndex
+
+def randomDict(seed=0):
+    rng = random.Random(seed)
+    chars = [chr(0x4E00 + i) for i in range(400)]
+    ranks = rng.sample(range(1, 1000), 300) + [0]*100
+    allChars = {}
+    for ch, rank in zip(chars, ranks):
+        js = {"radicals":rng.choice("口木水火土"), "strokes":str(rng.randint(1, 12))}
+        if rng.random() < 0.05:
+            js["strokes"] = rng.choice([None, "", "?"])
+        allChars[ch] = SimpleNamespace(char=ch, freq=rank, raw_js=js)
+    return SimpleNamespace(allChars=allChars)
+
+def bruteForce(md, radical=None, strokes=None, freq_limit=None):
+    """ the scan of all ChChars the index replaces """
+    found = []
+    for cc in sorted(md.allChars.values(), key=lambda cc: (cc.freq == 0, cc.freq)):
+        try:
+            n = int(cc.raw_js["strokes"] or 0)
+        except ValueError:
+            n = 0
+        if radical is not None and cc.raw_js["radicals"] != radical:
+            continue
+        if strokes is not None:
+            lo, hi = CharIndex.strokeRange(strokes)
+            if not lo <= n <= hi:
+                continue
+        if freq_limit and not 0 < cc.freq <= freq_limit:
+            continue
+        found.append(cc.char)
+    return found
+
+def test_same_as_scanning_all_chars():
+    md = randomDict()
+    index = CharIndex.fromDict(md)
+    for radical in (None, "口", "水", "金"):
+        for strokes in (None, 5, (3, 7), "8-12", "1"):
+            for freq_limit in (None, 100, 500):
+                assert index.find(radical, strokes, freq_limit) == \
+                        bruteForce(md, radical, strokes, freq_limit)
+
+def test_page():
+    md = randomDict()
+    index = CharIndex.fromDict(md)
+    total, chars = index.page("口", page=1, page_size=10)
+    assert total == len(bruteForce(md, "口"))
+    assert chars == bruteForce(md, "口")[10:20]
+
+def test_stroke_range():
+    assert CharIndex.strokeRange(5) == (5, 5)
+    assert CharIndex.strokeRange("5-8") == (5, 8)
+    assert CharIndex.strokeRange("5") == (5, 5)
+    assert CharIndex.strokeRange((2, 3)) == (2, 3)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import json
+import threading
+import pytest
+from DictClient import connectDictServer, DictServerError
+
+dict_server = pytest.importorskip("dict_server") #needs jieba
+
+@pytest.fixture(name="client")
+def fixture_client(tmp_path, built_dict):
+    md = built_dict
+    fn = str(tmp_path/"s.sock")
+    server = dict_server.DictServer(fn, dict_server.DictService(md))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = connectDictServer(fn)
+    yield md, client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+def test_no_daemon(tmp_path):
+    assert connectDictServer(str(tmp_path/"none.sock")) is None
+    (tmp_path/"stale.sock").touch()
+    assert connectDictServer(str(tmp_path/"stale.sock")) is None
+
+def asJson(x):
+    return json.loads(json.dumps(x.asDict(), ensure_ascii=False))
+
+def test_entries_same_as_in_process(client):
+    md, client = client
+    for key in ("好", "好人", "好人好事"):
+        assert asJson(client.lookup(key)) == asJson(md.lookup(key))
+    assert [x and x.getName() for dummy, x in client.lookup_many(["好人", "坏人"])] == \
+            ["好人", None]
+    assert client.lookup("好").words[0].word == md.lookup("好").words[0].word
+
+def test_queries(client):
+    md, client = client
+    assert client.call("ping") == "pong"
+    assert client.prefix("好") == md.headwords.withPrefix("好")
+    words, idioms = client.related("好")
+    assert [w for w, dummy in words] == [cw.word for cw in md.relatedWords("好")]
+    assert [w for w, dummy in idioms] == ["好人好事"]
+
+def test_errors(client):
+    dummy, client = client
+    with pytest.raises(KeyError):
+        client.lookup("坏人")
+    with pytest.raises(DictServerError):
+        client.call("nothing")
+    #a request missing its params is malformed, not a word that isn't there
+    with pytest.raises(DictServerError, match="lookup needs key"):
+        client.call("lookup")
+    with pytest.raises(DictServerError, match="related needs key"):
+        client.call("related", n=3)
+    with pytest.raises(KeyError):
+        client.related("坏")
+    assert client.call("ping") == "pong" #the connection survives errors
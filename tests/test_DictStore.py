@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import os
+import json
+import sqlite3
+import pytest
+import DictStore as dict_store
+from DictStore import DictStore, KIND_WORD, KIND_IDIOM, openDictStore
+
+def asJson(x):
+    return json.loads(json.dumps(x.asDict(), ensure_ascii=False))
+
+@pytest.fixture(name="stored")
+def fixture_stored(tmp_path, built_dict):
+    md = built_dict
+    fn = str(tmp_path/"store.sqlite")
+    DictStore.generate(md, fn)
+    store = DictStore(fn)
+    yield md, store
+    store.close()
+
+def test_lookups_same_as_the_dict(stored):
+    md, store = stored
+    for key in ("好", "人", "好人", "好事", "人人", "好人好事"):
+        assert asJson(store.lookup(key)) == asJson(md.lookup(key))
+    assert [w for w, x in store.lookup_many(["好人", "坏人"])] == ["好人", "坏人"]
+    assert store.lookup_many(["坏人"])[0][1] is None
+    with pytest.raises(KeyError):
+        store.lookup("坏人")
+
+def test_entries_using_a_char(stored):
+    dummy, store = stored
+    words = sorted(x.word for x in store.entriesUsing(KIND_WORD, "人"))
+    assert words == ["人人", "好人"]
+    assert [x.word for x in store.entriesUsing(KIND_WORD, "人", exclude={"好人"})] == ["人人"]
+    assert [x.idiom for x in store.entriesUsing(KIND_IDIOM, "事")] == ["好人好事"]
+
+def test_store_queries(stored):
+    md, store = stored
+    assert store.has(KIND_WORD, "好人") and not store.has(KIND_WORD, "好人好事")
+    assert store.count(KIND_WORD) == len(md.allWords)
+    assert sorted(store.keys(KIND_WORD)) == sorted(md.allWords)
+    assert sorted(w for w, dummy in store.entries(KIND_WORD, exclude={"好事"})) == \
+            sorted(w for w in md.allWords if w != "好事")
+
+def test_fresh_for_current_dicts(stored):
+    dummy, store = stored
+    assert store.isFresh()
+
+def test_unwritable_cache_falls_back_to_the_dict(tmp_path, built_dict):
+    md = built_dict
+    (tmp_path/"cache").write_text("not a dir")
+    fn = str(tmp_path/"cache"/"store.sqlite")
+    assert not DictStore.generate(md, fn)
+    assert openDictStore(fn, md) is md
+
+def test_failed_generate_leaves_no_tmp_file(tmp_path, monkeypatch, built_dict):
+    def fail():
+        raise sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(dict_store, "dictFingerprint", fail)
+    assert not DictStore.generate(built_dict, str(tmp_path/"store.sqlite"))
+    assert not os.listdir(tmp_path)
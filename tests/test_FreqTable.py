@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import gzip
+import random
+from FreqTable import FreqTable
+
+def oldTable(fn):
+    """ the dict based table FreqTable replaces """
+    table = {}
+    with gzip.open(fn, "rt", encoding="utf-8") as fp:
+        for line in fp:
+            ch_w, count, rank = line.split()
+            table[ch_w] = (int(count), int(rank))
+    return table
+
+def writeFreqFile(fn, lines):
+    with gzip.open(fn, "wt", encoding="utf-8") as fp:
+        for w, count, rank in lines:
+            fp.write("%s %d %d\n"%(w, count, rank))
+
+def test_same_as_the_dict_table(tmp_path):
+    rng = random.Random(0)
+    chars = "天地人你我他好大小中国"
+    words = list(dict.fromkeys("".join(rng.choices(chars, k=rng.randint(1, 4)))
+                               for dummy in range(500))) #a word is listed once
+    lines = [(w, 10**6//rank, rank) for rank, w in enumerate(words, 1)]
+    fn = str(tmp_path/"freq.gz")
+    writeFreqFile(fn, lines)
+
+    old = oldTable(fn)
+    table = FreqTable.load(fn)
+    assert len(table) == len(old)
+    assert list(table) == list(old)
+    for w, (count, rank) in old.items():
+        assert w in table
+        assert table[w] == (count, rank)
+        assert table.rank(w) == rank and table.count(w) == count
+    assert not "不在" in table
+    assert table.rank("不在") == 0 and table.count("不在", -1) == -1
+    ranks = table.rankOfMany(list(old) + ["不在"])
+    assert list(ranks) == [rank for count, rank in old.values()] + [0]
+    assert table.wordsBelowRank(100) == [w for w, (c, r) in old.items() if r < 100]
+
+def test_words_below_rank_out_of_order():
+    table = FreqTable()
+    for w, rank in (("天", 3), ("地", 1), ("人", 5), ("你", 2)):
+        table.add(w, 100 - rank, rank)
+    assert not table.rank_sorted
+    assert table.wordsBelowRank(4) == ["地", "你", "天"]
+    table.add("天", 99, 9) #a word listed again takes the later count and rank
+    assert table["天"] == (99, 9)
+    assert len(table) == 4
+
+def test_stars():
+    assert FreqTable.stars(1) == "★★★★★"
+    assert FreqTable.stars(3000) == "★★★"
+    assert FreqTable.stars(30000) == ""
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+from FuzzyIndex import FuzzyIndex, withinOneEdit, deletions
+
+def test_within_one_edit():
+    assert withinOneEdit("书法", "书画") #replaced
+    assert withinOneEdit("书法家", "书法") #removed
+    assert withinOneEdit("书法", "书法家") #inserted
+    assert withinOneEdit("法书", "书法") #swapped
+    assert not withinOneEdit("书法", "画家")
+    assert not withinOneEdit("书法家", "法书家家")
+    assert not withinOneEdit("一二三", "三二一")
+
+def test_deletions():
+    assert deletions("书法家") == ["法家", "书家", "书法"]
+
+def index():
+    words = sorted(["书", "法", "画", "书法", "书画", "书法家", "画家", "中国"])
+    return FuzzyIndex(words, {"書":"书", "發":"发"},
+                      {"法":frozenset(["fa"]), "发":frozenset(["fa"]), "画":frozenset(["hua"])})
+
+def test_candidates():
+    fi = index()
+    found = {fi.words[row]:dist for row, dist in fi.candidates("书发").items()}
+    assert found == {"书法":1, "书画":1}
+    found = {fi.words[row]:dist for row, dist in fi.candidates("书法").items()}
+    assert found == {"书画":1, "书法家":1} #the word itself isn't a candidate
+    assert fi.candidates("天气") == {}
+
+def test_no_single_chars_for_longer_words():
+    fi = index()
+    #书 and 法 are a char of 书法 dropped, both headwords, neither a suggestion
+    found = {fi.words[row] for row in fi.candidates("书法")}
+    assert not found & {"书", "法"}
+    assert {fi.words[row] for row in fi.candidates("法书")} == {"书法"}
+    assert {fi.words[row] for row in fi.candidates("书")} == {"书法", "书画"}
+
+def test_variants_are_simplified():
+    fi = index()
+    assert fi.simplify("書發") == "书发"
+    found = {fi.words[row]:dist for row, dist in fi.candidates("書法").items()}
+    assert found["书法"] == 0
+
+def test_homophones():
+    fi = index()
+    assert fi.homophones("发", "法")
+    assert not fi.homophones("发", "画")
+    assert not fi.homophones("发", "天") #no reading known
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+from HeadwordTrie import HeadwordTrie
+
+def trie():
+    """ freq is the rank of the word, the lower the hotter """
+    return HeadwordTrie([("中", 9), ("中国", 5), ("中国人", 2), ("中文", 0), ("国人", 0),
+                         ("人民", 3), ("好", 7)])
+
+def test_prefix_hottest_first_freq_0_last():
+    t = trie()
+    assert t.withPrefix("中") == ["中国人", "中国", "中", "中文"]
+    assert t.withPrefix("中", limit=2) == ["中国人", "中国"]
+    assert t.withPrefix("国") == ["国人"]
+    assert t.withPrefix("中", by_freq=False) == ["中", "中国", "中国人", "中文"]
+    assert t.withPrefix("天") == []
+
+def test_matches_at_position():
+    t = trie()
+    assert t.matchesAt("中国人民", 0) == ["中", "中国", "中国人"]
+    assert t.longestMatch("中国人民", 2) == "人民"
+    assert t.longestMatch("天下", 0) is None
+
+def test_all_matches_like_cut_all():
+    t = trie()
+    #every multi-char headword at every position, uncovered chars by themselves
+    assert t.allMatches("中国人民好") == ["中国", "中国人", "国人", "人民", "好"]
+    assert t.allMatches("天中国") == ["天", "中国"]
+    #words not accepted don't cover their chars
+    assert t.allMatches("国人民", lambda w: w != "人民") == ["国人", "民"]
+    assert t.allMatches("中国", lambda w: False) == ["中", "国"]
+
+def test_add_after_build():
+    t = trie()
+    t.add("天下", 1)
+    t.add("中国", 6)
+    assert "天下" in t
+    assert len(t) == 8
+    assert t.keys == sorted(t.keys)
+    assert t.freqs[t.keys.index("中国")] == 6
+    assert t.allMatches("天下好") == ["天下", "好"]
+    t.add("中国人民共和国")
+    assert t.longestMatch("中国人民共和国万岁") == "中国人民共和国"
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import os
+import pytest
+from MultiChineseDict import MultiChineseDict, ChWord, dictFingerprint, RELATED_TOP_K
+from FreqTable import FreqTable
+
+def writeKeepingStat(fn, data):
+    st = os.stat(fn)
+    with open(fn, "wb") as fp:
+        fp.write(data)
+    os.utime(fn, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+def test_fingerprint_reuses_sha1_of_unchanged_files(tmp_path):
+    (tmp_path/"a.gz").write_bytes(b"aaaa")
+    (tmp_path/"sub").mkdir()
+    (tmp_path/"sub"/"b.gz").write_bytes(b"bbbb")
+    known = dictFingerprint(str(tmp_path))
+    assert [f[0] for f in known] == ["a.gz", os.path.join("sub", "b.gz")]
+
+    #same size and mtime: the recorded sha1 is kept, the file isn't read
+    writeKeepingStat(tmp_path/"a.gz", b"AAAA")
+    assert dictFingerprint(str(tmp_path), known=known) == known
+    assert dictFingerprint(str(tmp_path)) != known
+
+def test_fingerprint_hashes_changed_files(tmp_path):
+    (tmp_path/"a.gz").write_bytes(b"aaaa")
+    known = dictFingerprint(str(tmp_path))
+    (tmp_path/"a.gz").write_bytes(b"aaaaa")
+    assert dictFingerprint(str(tmp_path), known=known) == dictFingerprint(str(tmp_path))
+    assert dictFingerprint(str(tmp_path), known=known) != known
+
+def smallDict():
+    md = MultiChineseDict(load=False)
+    md.jsWord = [{"word":"好", "oldword":"好", "strokes":"6", "pinyin":"hǎo", "radicals":"女",
+                  "explanation":"", "more":""}]
+    md.jsCi = [{"ci":"好人", "explanation":""}]
+    md.jsIdiom = []
+    md.x7ChWords = {"好":[["好", ["形"], "hǎo", ["❶优点多的"]]],
+                    "囧":[["囧", ["形"], "jiǒng", ["❶窘迫"]]],
+                    "好人":[["好人", ["名"], "hǎorén", ["❶品行好的人"]]]}
+    md.allFreq = FreqTable()
+    md.allFreq.add("好", 1000, 1)
+    md.build()
+    return md
+
+def test_x7_only_char_gets_pinyin_but_no_explanations():
+    md = smallDict()
+    assert md.lookup("囧").raw_js["pinyin"] == "jiǒng"
+    assert not md.lookup("囧").raw_js["x7explanation"]
+    assert md.lookup("好").raw_js["x7explanation"]
+    assert md.lookup("好人").raw_js["x7explanation"]
+
+def test_added_word_is_a_headword():
+    md = smallDict()
+    assert md.suggest("好仁")[0][0] == "好人"
+    md.addWord(ChWord("好事", {"ci":"好事", "explanation":"n/a"}))
+    assert md.lookup("好事").word == "好事"
+    assert md.headwords.allMatches("好事多") == ["好事", "多"]
+    assert md.suggest("好是")[0][0] == "好事"
+
+def test_released_sources_arent_decoded_again():
+    md = smallDict()
+    with pytest.raises(AttributeError):
+        md.jsCi #pylint: disable=W0104
+    assert not "jsCi" in md.__dict__
+
+def test_suggest_ranks_against_the_simplified_word():
+    md = MultiChineseDict(load=False)
+    md.jsWord = [{"word":c, "oldword":old, "strokes":"5", "pinyin":py, "radicals":"",
+                  "explanation":"", "more":""}
+                 for c, old, py in (("书", "書", "shū"), ("法", "法", "fǎ"),
+                                    ("发", "發", "fā"), ("画", "畫", "huà"))]
+    md.jsCi = [{"ci":w, "explanation":"释义"} for w in ("书法", "书画")]
+    md.jsIdiom = []
+    md.allFreq = FreqTable()
+    md.allFreq.add("书画", 2000, 1)
+    md.allFreq.add("书法", 1000, 2)
+    md.build()
+    #发 of 書發 reads like 法, which only shows against 书发, not against 書發
+    assert [w for w, dummy in md.suggest("書發")][:2] == ["书法", "书画"]
+    assert md.suggest("書法")[0] == ("书法", 0)
+
+def relatedDict(num_words, num_idioms):
+    """ 好 used by num_words words and num_idioms idioms, with tied and missing freqs """
+    md = MultiChineseDict(load=False)
+    md.jsWord = [{"word":c, "oldword":c, "strokes":"6", "pinyin":"", "radicals":"",
+                  "explanation":"", "more":""} for c in ("好", "人")]
+    words = ["好" + chr(0x4e00 + i) for i in range(num_words)] + ["好人", "人人"]
+    idioms = ["好人" + chr(0x4e00 + i) + "事" for i in range(num_idioms)]
+    #an idiom listed as ci too is an idiom, not one of the words
+    md.jsCi = [{"ci":w, "explanation":""} for w in words + idioms[:1]]
+    md.jsIdiom = [{"word":w, "pinyin":"", "explanation":"", "derivation":"", "example":"",
+                   "abbreviation":""} for w in idioms]
+    md.allFreq = FreqTable()
+    for i, w in enumerate(words + idioms):
+        if i%5 != 4: #every 5th isn't in the freq list, so stays out of the related lists
+            md.allFreq.add(w, 1, (i*7)%(num_words//3 + 2) + 1)
+    md.build()
+    return md
+
+def fullSort(entries, ch, skip=()):
+    """ what build() kept for a char before the top-K lists: all of them, stably sorted """
+    return sorted((x for w, x in entries.items() if ch in w and x.freq > 0 and not w in skip),
+                  key=lambda x: x.freq)
+
+def limited(items, n, freq_limit):
+    if freq_limit:
+        items = [x for x in items if x.freq <= freq_limit]
+    return items[:n]
+
+@pytest.mark.parametrize("num", [RELATED_TOP_K//2, RELATED_TOP_K*3])
+@pytest.mark.parametrize("n", [None, 1, RELATED_TOP_K - 1, RELATED_TOP_K, RELATED_TOP_K + 1,
+                               RELATED_TOP_K*2, RELATED_TOP_K*5])
+@pytest.mark.parametrize("freq_limit", [None, 3, RELATED_TOP_K//2])
+def test_related_same_as_a_full_sort(num, n, freq_limit):
+    md = relatedDict(num, num)
+    words = fullSort(md.allWords, "好", skip=md.allIdioms)
+    idioms = fullSort(md.allIdioms, "好")
+    assert md.relatedWords("好", n, freq_limit) == limited(words, n, freq_limit)
+    assert md.relatedIdioms("好", n, freq_limit) == limited(idioms, n, freq_limit)
+
+def test_char_keeps_the_top_k_hottest():
+    md = relatedDict(RELATED_TOP_K*3, RELATED_TOP_K*3)
+    cc = md.lookup("好")
+    words = fullSort(md.allWords, "好", skip=md.allIdioms)
+    assert cc.numWords == len(words) > RELATED_TOP_K
+    assert cc.words == words[:RELATED_TOP_K]
+    assert cc.idioms == fullSort(md.allIdioms, "好")[:RELATED_TOP_K]
+    #more than the top-K falls back to scanning allWords/allIdioms
+    assert md.relatedWords("好") == words
+    assert len(md.relatedIdioms("好", RELATED_TOP_K + 1)) == RELATED_TOP_K + 1
+    #a char used by fewer words keeps them all
+    assert md.lookup("人").words == fullSort(md.allWords, "人", skip=md.allIdioms)
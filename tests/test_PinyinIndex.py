@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+from PinyinIndex import PinyinIndex
+
+def test_normalize():
+    assert PinyinIndex.normalize("Shì") == ("shì", "shi")
+    assert PinyinIndex.normalize("tiān qì") == ("tiānqì", "tianqi")
+    assert PinyinIndex.normalize("lǜ") == ("lǜ", "lv")
+    #x7 writes IPA letters
+    assert PinyinIndex.normalize("ɡɑ̄") == ("gā", "ga")
+
+def test_numbered_to_marked():
+    assert PinyinIndex.numberedToMarked("shi4") == "shì"
+    assert PinyinIndex.numberedToMarked("lv4shi1") == "lǜshī"
+    assert PinyinIndex.numberedToMarked("hao3") == "hǎo"
+    assert PinyinIndex.numberedToMarked("ma5") == "ma"
+
+def test_readings_skip_non_pinyin():
+    raw_js = {"pinyin":["hǎo", "❶〈形〉优点多的", None, ""],
+              "x7explanation":[("好", (), "hào", ("❶喜爱",)), ("好", (), "", ())]}
+    assert PinyinIndex.readings(raw_js) == ["hǎo", "hào"]
+    assert PinyinIndex.readings({"pinyin":"tiān"}) == ["tiān"]
+    assert PinyinIndex.readings({"pinyin":None}) == []
+
+def test_find_and_page():
+    index = PinyinIndex()
+    for pinyin, w in (("shì", "是"), ("shí", "十"), ("shì", "事"), ("tiānqì", "天气")):
+        index.add(pinyin, w)
+    assert index.find("shì") == ["是", "事"]
+    assert index.find("shi4") == ["是", "事"]
+    assert index.find("shi") == ["是", "十", "事"]
+    assert index.find("tian1qi4") == ["天气"]
+    assert index.page("shi", 1, 2) == (3, ["事"])
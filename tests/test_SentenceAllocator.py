@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import random
+from SentenceAllocator import SentenceAllocator
+
+class OldAllocator:
+    """ the sort getExampleSentence() did before SentenceAllocator """
+    def __init__(self):
+        self.count = {}
+
+    def pick(self, word, sentences): #pylint: disable=W0613
+        keys = list(sentences)
+        keys.sort(key=lambda x: self.count.get(x, 0))
+        self.count[keys[0]] = self.count.get(keys[0], 0) + 1
+        return keys[0]
+
+def test_same_picks_as_the_old_sort():
+    rng = random.Random(0)
+    sentences = ["句子%d"%i for i in range(60)]
+    words = {"词%d"%i:dict.fromkeys(rng.sample(sentences, rng.randint(1, 12)), 0)
+             for i in range(30)}
+    picks = [rng.choice(list(words)) for dummy in range(1000)]
+    old = OldAllocator()
+    new = SentenceAllocator()
+    assert [new.pick(w, words[w]) for w in picks] == [old.pick(w, words[w]) for w in picks]
+
+def test_shared_sentence_used_up_for_all_words():
+    alloc = SentenceAllocator()
+    assert alloc.pick("天", {"天气好": 0, "天很蓝": 0}) == "天气好"
+    assert alloc.pick("气", {"天气好": 0, "气温高": 0}) == "气温高"
+    assert alloc.pick("天", {"天气好": 0, "天很蓝": 0}) == "天很蓝"
+    #all used once, the tie goes to the first in lesson order
+    assert alloc.pick("天", {"天气好": 0, "天很蓝": 0}) == "天气好"
+    assert alloc.pick("气", {"天气好": 0, "气温高": 0}) == "气温高"
+
+def test_sentences_added_later():
+    alloc = SentenceAllocator()
+    sentences = {"一": 0}
+    assert [alloc.pick("词", sentences) for dummy in range(2)] == ["一", "一"]
+    sentences["二"] = 0
+    assert alloc.pick("词", sentences) == "二"
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import json
+import pickle
+from StringPool import StringPool
+
+def decoded(x):
+    """ a new copy of x, as json decoding makes one per use """
+    return json.loads(json.dumps(x))
+
+def test_equal_strings_shared():
+    pool = StringPool()
+    a = pool.intern("".join(["hǎo", "rén"]))
+    b = pool.intern("".join(["hǎo", "rén"]))
+    assert a is b
+    assert pool.dropped == 1 and pool.saved > 0
+
+def test_x7_explanations_become_shared_tuples():
+    x7e = [["好人", ["名"], "hǎorén", ["❶品行好的人", "❷老好人"]]]
+    pool = StringPool()
+    a = pool.x7(decoded(x7e))
+    b = pool.x7(decoded(x7e))
+    assert a is b
+    assert a == (("好人", ("名",), "hǎorén", ("❶品行好的人", "❷老好人")),)
+    #indexed the same as the lists it replaces
+    assert a[0][2] == x7e[0][2] and a[0][3][1] == x7e[0][3][1]
+
+def test_strings_pooled_in_place():
+    pool = StringPool()
+    d1 = {"ci":"好人", "explanation":decoded("品行好的人"), "n":1}
+    d2 = {"ci":"好人", "explanation":decoded("品行好的人"), "n":1}
+    pool.strings(d1)
+    pool.strings(d2)
+    assert d1["explanation"] is d2["explanation"]
+    assert d1 == d2
+
+def test_sharing_survives_pickle():
+    pool = StringPool()
+    x7e = [["好", ["形"], "hǎo", ["❶优点多的"]]]
+    entries = [{"x7explanation":pool.x7(decoded(x7e))} for dummy in range(3)]
+    loaded = pickle.loads(pickle.dumps(entries))
+    assert loaded[0]["x7explanation"] is loaded[2]["x7explanation"]
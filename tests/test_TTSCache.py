@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import os
+import json
+from TTSService import TTSService
+from TTSCache import TTSCache, MANIFEST_FILE
+
+def newCache(output_dir, **config):
+    config.setdefault("TTS_BACKEND", "fake")
+    return TTSCache(TTSService(config), output_dir)
+
+def touch(fn, data=b"mp3"):
+    with open(fn, "wb") as fp:
+        fp.write(data)
+
+def test_missing_file_needs_synthesis(tmp_path):
+    cache = newCache(str(tmp_path))
+    assert not cache.fetch("text", "好", str(tmp_path/"好.mp3"))
+
+def test_recorded_file_is_fresh(tmp_path):
+    cache = newCache(str(tmp_path))
+    touch(tmp_path/"好.mp3")
+    cache.record("text", "好", str(tmp_path/"好.mp3"))
+    cache.save()
+    assert newCache(str(tmp_path)).fetch("text", "好", str(tmp_path/"好.mp3"))
+
+def test_trailing_slash_output_dir(tmp_path):
+    output_dir = str(tmp_path) + "/"
+    touch(tmp_path/"好.mp3")
+    cache = newCache(output_dir)
+    output = "%s/%s.mp3"%(output_dir, "好")
+    assert cache.name(output) == "好.mp3"
+    assert cache.fetch("text", "好", output)
+    cache.save()
+    with open(tmp_path/MANIFEST_FILE) as fp:
+        assert list(json.load(fp)) == ["好.mp3"]
+
+def test_existing_file_without_key_is_adopted(tmp_path):
+    touch(tmp_path/"old.mp3", b"legacy")
+    cache = newCache(str(tmp_path))
+    assert cache.fetch("text", "old", str(tmp_path/"old.mp3"))
+    assert cache.files["old.mp3"] == cache.key("text", "old")
+
+def test_new_voice_makes_file_stale(tmp_path):
+    cache = newCache(str(tmp_path))
+    touch(tmp_path/"好.mp3")
+    cache.record("text", "好", str(tmp_path/"好.mp3"))
+    cache.save()
+    cache = newCache(str(tmp_path), GOOGLE_TTS_VOICE_NAME="cmn-CN-Wavenet-B")
+    assert not cache.fetch("text", "好", str(tmp_path/"好.mp3"))
+
+def test_same_audio_is_copied(tmp_path):
+    cache = newCache(str(tmp_path))
+    touch(tmp_path/"好.mp3", b"audio of hao")
+    cache.record("text", "好", str(tmp_path/"好.mp3"))
+    assert cache.fetch("text", "好", str(tmp_path/"copy.mp3"))
+    assert (tmp_path/"copy.mp3").read_bytes() == b"audio of hao"
+
+def test_directory_is_listed_once(tmp_path):
+    cache = newCache(str(tmp_path))
+    assert not cache.exists("a.mp3")
+    touch(tmp_path/"a.mp3") #written behind the cache's back, not seen
+    assert not cache.exists("a.mp3")
+    cache.record("text", "a", str(tmp_path/"a.mp3"))
+    assert cache.exists("a.mp3")
+
+def test_break_time_only_keys_ssml(tmp_path):
+    short = newCache(str(tmp_path), GOOGLE_TTS_PARAGRAPH_BREAK_TIME="1s")
+    long = newCache(str(tmp_path), GOOGLE_TTS_PARAGRAPH_BREAK_TIME="3s")
+    assert short.key("text", "好") == long.key("text", "好")
+    assert short.key("ssml", "<speak>好</speak>") != long.key("ssml", "<speak>好</speak>")
+
+def test_probe_changes_nothing(tmp_path):
+    cache = newCache(str(tmp_path))
+    touch(tmp_path/"好.mp3")
+    cache.record("text", "好", str(tmp_path/"好.mp3"))
+    cache.save()
+
+    cache = newCache(str(tmp_path))
+    touch(tmp_path/"old.mp3")
+    assert cache.probe("text", "好", str(tmp_path/"好.mp3"))
+    assert cache.probe("text", "旧", str(tmp_path/"old.mp3")) #would be adopted
+    assert not cache.probe("text", "坏", str(tmp_path/"好.mp3")) #stale
+    #the audio of 好 could be copied, but only fetch() does that
+    assert not cache.probe("text", "好", str(tmp_path/"copy.mp3"))
+    assert not os.path.exists(tmp_path/"copy.mp3")
+    assert not cache.dirty and cache.adopted == 0
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import os
+import time
+from TTSService import TTSService
+from TTSCache import TTSCache
+from TTSPool import TTSPool, TokenBucket
+
+def fakeTTS(latency=0.01):
+    return TTSService({"TTS_BACKEND":"fake", "FAKE_TTS_LATENCY":latency})
+
+def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(50, burst=5)
+    start = time.monotonic()
+    for dummy in range(15):
+        bucket.take()
+    #5 at once, the other 10 at 50/s
+    assert time.monotonic() - start >= 0.18
+
+def test_token_bucket_without_limit():
+    bucket = TokenBucket(None)
+    start = time.monotonic()
+    for dummy in range(1000):
+        bucket.take()
+    assert time.monotonic() - start < 0.1
+
+def test_jobs_run_once_per_output(tmp_path):
+    tts = fakeTTS()
+    jobs = [("text", "词%d"%(i % 5), str(tmp_path/("%d.mp3"%(i % 5)))) for i in range(20)]
+    assert TTSPool(tts, 4).synthesize(jobs) == []
+    assert tts.backend.requests == 5
+    assert sorted(os.listdir(tmp_path)) == ["%d.mp3"%i for i in range(5)]
+
+def test_failed_jobs_returned(tmp_path):
+    tts = fakeTTS(latency=0.05)
+    jobs = [("text", "词%d"%i, str(tmp_path/("%d.mp3"%i))) for i in range(4)]
+    failed = TTSPool(tts, 4, timeout=0.01).synthesize(jobs)
+    assert sorted(failed) == sorted(jobs)
+    assert os.listdir(tmp_path) == []
+
+def test_cached_jobs_skipped(tmp_path):
+    tts = fakeTTS()
+    cache = TTSCache(tts, str(tmp_path))
+    jobs = [("text", "词%d"%i, str(tmp_path/("%d.mp3"%i))) for i in range(4)]
+    assert TTSPool(tts, 2, cache=cache).synthesize(jobs) == []
+    assert tts.backend.requests == 4
+
+    cache = TTSCache(tts, str(tmp_path))
+    jobs.append(("text", "词0", str(tmp_path/"copy.mp3")))
+    assert TTSPool(tts, 2, cache=cache).synthesize(jobs) == []
+    assert tts.backend.requests == 4 #copy.mp3 is a copy of 0.mp3
+    assert (tmp_path/"copy.mp3").read_bytes() == (tmp_path/"0.mp3").read_bytes()
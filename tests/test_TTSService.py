@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0115,C0116,R0903
+
+import os
+from types import SimpleNamespace
+import pytest
+import TTSService
+from TTSService import TTSService as Service, GoogleBackend, FakeBackend, writeAudio
+
+class Client:
+    """ stands in for texttospeech.TextToSpeechClient """
+    created = 0
+
+    def __init__(self):
+        Client.created += 1
+        self.requests = 0
+
+    def synthesize_speech(self, input, voice, audio_config, timeout): #pylint: disable=W0622
+        self.requests += 1
+        content = getattr(input, "text", None) or input.ssml
+        if content == "bad":
+            raise ConnectionError("connection reset")
+        return SimpleNamespace(audio_content=b"MP3" + content.encode("utf-8"))
+
+@pytest.fixture(name="google")
+def fixture_google(monkeypatch, tmp_path):
+    """ TTSService on GoogleBackend with a stubbed google client """
+    Client.created = 0
+    monkeypatch.setattr(TTSService, "texttospeech", SimpleNamespace(
+            TextToSpeechClient=Client,
+            VoiceSelectionParams=SimpleNamespace, AudioConfig=SimpleNamespace,
+            SynthesisInput=SimpleNamespace,
+            SsmlVoiceGender=SimpleNamespace(FEMALE=2), AudioEncoding=SimpleNamespace(MP3=1)))
+    monkeypatch.setenv("GOOGLE_APPLICATION_CREDENTIALS", "")
+    return Service({"GOOGLE_APPLICATION_CREDENTIALS":str(tmp_path/"key.json")})
+
+def test_google_client_is_shared(google, tmp_path):
+    assert isinstance(google.backend, GoogleBackend)
+    for i in range(3):
+        google.synthesize_chinese_text("好%d"%i, str(tmp_path/("%d.mp3"%i)))
+    google.synthesize_chinese_ssml("<speak>好</speak>", str(tmp_path/"ssml.mp3"))
+    assert Client.created == 1
+    assert google.backend.client.requests == 4
+    assert (tmp_path/"0.mp3").read_bytes() == "MP3好0".encode("utf-8")
+
+def test_google_connects_again_after_a_failure(google, tmp_path):
+    google.synthesize_chinese_text("好", str(tmp_path/"好.mp3"))
+    with pytest.raises(ConnectionError):
+        google.synthesize_chinese_text("bad", str(tmp_path/"bad.mp3"))
+    assert google.backend.client is None
+    google.synthesize_chinese_text("好", str(tmp_path/"好.mp3"))
+    assert Client.created == 2
+    #the failed request left no file behind
+    assert sorted(os.listdir(tmp_path)) == ["好.mp3"]
+
+def test_write_audio_is_atomic(tmp_path):
+    out = tmp_path/"a.mp3"
+    writeAudio(str(out), b"old")
+    with pytest.raises(TypeError):
+        writeAudio(str(out), "not bytes")
+    assert out.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["a.mp3"]
+
+def test_written_audio_follows_the_umask(tmp_path):
+    umask = os.umask(0o022)
+    try:
+        writeAudio(str(tmp_path/"a.mp3"), b"mp3")
+    finally:
+        os.umask(umask)
+    assert os.stat(tmp_path/"a.mp3").st_mode & 0o777 == 0o644
+
+def test_fake_backend_times_out(tmp_path):
+    tts = Service({"TTS_BACKEND":"fake", "FAKE_TTS_LATENCY":0.05})
+    assert isinstance(tts.backend, FakeBackend)
+    tts.synthesize_chinese_text("好", str(tmp_path/"好.mp3"), timeout=1)
+    with pytest.raises(TimeoutError):
+        tts.synthesize_chinese_text("坏", str(tmp_path/"坏.mp3"), timeout=0.01)
+    assert tts.backend.requests == 2
+    assert os.listdir(tmp_path) == ["好.mp3"]
+
+def test_old_name_still_works():
+    assert TTSService.GoogleTTS is Service
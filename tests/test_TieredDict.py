@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import pickle
+from MultiChineseDict import MultiChineseDict, ChWord
+from FreqTable import FreqTable
+from DictStore import DictStore, KIND_WORD
+from TieredDict import TieredEntries
+
+def tieredWords(tmp_path, hot=("好人",)):
+    md = MultiChineseDict(load=False)
+    md.jsWord = [{"word":"好", "oldword":"好", "strokes":"6", "pinyin":"hǎo", "radicals":"女",
+                  "explanation":"", "more":""}]
+    md.jsCi = [{"ci":w, "explanation":"释义"} for w in ("好人", "好事", "好久")]
+    md.jsIdiom = []
+    md.allFreq = FreqTable()
+    md.build()
+    fn = str(tmp_path/"store.sqlite")
+    DictStore.generate(md, fn)
+    return TieredEntries({w:md.allWords[w] for w in hot}, DictStore(fn), KIND_WORD)
+
+def test_membership_doesnt_fault_in(tmp_path):
+    words = tieredWords(tmp_path)
+    assert "好事" in words
+    assert not "好吗" in words
+    assert words.hits == 0 and words.misses == 0
+    assert dict.__len__(words) == 1
+
+def test_lookup_faults_in(tmp_path):
+    words = tieredWords(tmp_path)
+    assert words["好事"].word == "好事"
+    assert words.get("好吗") is None
+    assert (words.hits, words.misses) == (1, 1)
+    assert dict.__len__(words) == 2
+    assert len(words) == 3
+
+def test_len_and_iteration_cover_both_tiers(tmp_path):
+    words = tieredWords(tmp_path)
+    assert len(words) == 3
+    assert sorted(words) == ["好久", "好事", "好人"]
+    assert sorted(w for w, dummy in words.items()) == ["好久", "好事", "好人"]
+    assert sorted(x.word for x in words.values()) == ["好久", "好事", "好人"]
+    assert dict.__len__(words) == 1 #iterating didn't fault anything in
+
+    words["好吗"] = ChWord("好吗", {"ci":"好吗", "explanation":"n/a"})
+    words["好久"] = words["好久"]
+    assert len(words) == 4
+    assert sorted(words) == ["好久", "好事", "好人", "好吗"]
+
+def test_pickles_the_hot_tier(tmp_path):
+    words = tieredWords(tmp_path)
+    assert sorted(pickle.loads(pickle.dumps(words))) == ["好人"]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import random
+from WordMatcher import WordMatcher, SubstringIndex
+
+def test_overlapping_words():
+    m = WordMatcher(["he", "she", "his", "hers", "s"])
+    assert m.findIn("ushers") == {"he", "hers", "s", "she"}
+    assert m.findIn("xyz") == set()
+
+def test_chinese_words_and_fail_links():
+    m = WordMatcher(["天气", "气候", "天", "好天气"])
+    assert m.findIn("今天天气很好") == {"天", "天气"}
+    assert m.findIn("好天气候") == {"天", "天气", "好天气", "气候"}
+
+def test_empty_word_is_ignored():
+    assert WordMatcher(["", "天"]).findIn("天") == {"天"}
+
+def test_sentences_in_order_match_find():
+    rng = random.Random(3)
+    chars = [chr(0x4e00 + i) for i in range(30)]
+    sentences = list(dict.fromkeys("".join(rng.choices(chars, k=rng.randint(3, 20)))
+                                   for dummy in range(300)))
+    words = list({"".join(rng.choices(chars, k=rng.randint(1, 3))) for dummy in range(200)})
+    expected = {}
+    for w in words:
+        for s in sentences:
+            if s.find(w) != -1:
+                expected.setdefault(w, {})[s] = 0
+    found = WordMatcher(words).sentencesOf(sentences)
+    assert found == expected
+    assert all(list(found[w]) == list(expected[w]) for w in expected)
+
+def test_substring_index():
+    index = SubstringIndex(["天气预报", "好天气", "学生"])
+    assert "天" in index
+    assert "天气" in index
+    assert "气预" in index
+    assert "学生" in index
+    assert not "地" in index
+    assert not "天学" in index
+    assert not "预报员" in index
+
+def test_substring_index_empty_word():
+    assert not "" in SubstringIndex(["天气"])
+    assert not "" in SubstringIndex([])
+    assert not "天" in SubstringIndex([""])
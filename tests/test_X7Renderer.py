@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import pickle
+from X7Renderer import X7Renderer
+
+def oldHtml(x7e):
+    """ the string concatenation X7Renderer.toHtml() replaces """
+    s = ""
+    num = 0
+    for x in x7e:
+        num = num+1
+        dummy, cx, pinyin, expl = x
+        if len(x7e)>1:
+            s = s + "<b>/～:%d/</b><br>"%num
+        if pinyin:
+            s = s + "[%s] " % pinyin
+        for c in cx:
+            s =  s + "<%s>"%c
+        s = s + "<br>"
+        for ex in expl:
+            s = s + "%s<br>"%ex
+        s = s + "<br>"
+    return s
+
+X7 = {"好":[["好", ["形"], "hǎo", ["❶优点多的", "❷友爱"]],
+            ["好", ["动"], "hào", ["❶喜爱"]]],
+      "好人":[["好人", ["名"], "hǎorén", ["❶品行好的人"]]],
+      "囧":[["囧", [], "", []]]}
+
+def test_same_html_as_before():
+    for x7e in X7.values():
+        assert X7Renderer.toHtml(x7e) == oldHtml(x7e)
+
+def test_cache_bounded_lru():
+    renderer = X7Renderer(maxsize=2)
+    renderer.render("好", X7["好"])
+    renderer.render("好人", X7["好人"])
+    renderer.render("好", X7["好"]) #now the most recently used
+    renderer.render("囧", X7["囧"])
+    assert list(renderer.cache) == ["好", "囧"]
+
+def test_prerendered_html_pickled_without_the_cache():
+    renderer = X7Renderer()
+    renderer.prerender(X7)
+    renderer.render("好", None)
+    assert renderer.render("好人", None) == oldHtml(X7["好人"])
+    loaded = pickle.loads(pickle.dumps(renderer))
+    assert loaded.rendered == renderer.rendered
+    assert not loaded.cache
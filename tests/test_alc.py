@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import pytest
+from HeadwordTrie import HeadwordTrie
+
+pytest.importorskip("jieba")
+import alc #pylint: disable=C0413
+
+HEADWORDS = HeadwordTrie([(w, 1) for w in ("企业", "企业法", "宜昌港", "港", "宜", "昌")])
+
+def test_jieba_cut_all_by_default():
+    assert alc.splitWord("企业法宜昌港") == ["企业", "企业法", "宜昌", "港"]
+
+def test_headword_match_on_request():
+    #宜昌 is only known to jieba, 宜昌港 only to the dictionary
+    assert alc.splitWord("企业法宜昌港", HEADWORDS) == ["企业", "企业法", "宜昌港"]
+    assert alc.splitWord("企业法宜昌港", HEADWORDS, lambda w: w != "宜昌港") == \
+            ["企业", "企业法", "宜", "昌", "港"]
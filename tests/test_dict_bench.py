@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import pickle
+from dict_bench import syntheticSources, buildPhases
+
+def test_runs_build_the_same_dictionary():
+    sources = syntheticSources(scale=0.005)
+    before = pickle.dumps(sources)
+    first, dummy = buildPhases(sources)
+    second, dummy = buildPhases(sources)
+    assert pickle.dumps(sources) == before #the sources aren't changed by a run
+    for name in ("allChars", "allWords", "allIdioms"):
+        assert sorted(getattr(first, name)) == sorted(getattr(second, name))
+    assert [x.raw_js for x in first.allWords.values()] == \
+            [x.raw_js for x in second.allWords.values()]
+
+def test_synthetic_sources_are_reproducible():
+    assert pickle.dumps(syntheticSources(0.002, seed=1)) == \
+            pickle.dumps(syntheticSources(0.002, seed=1))
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,C0114,C0116
+
+import os
+import gzip
+import json
+import logging
+import pytest
+import MultiChineseDict
+from MultiChineseDict import MultiChineseDict as Dict, BUILD_LAYERS
+
+def char(c, py):
+    return {"word":c, "oldword":c, "strokes":"5", "pinyin":py, "radicals":"口",
+            "explanation":"释义 %s"%c, "more":""}
+
+def idiom(w):
+    return {"word":w, "pinyin":"", "explanation":"释义 %s"%w, "derivation":"", "example":"",
+            "abbreviation":""}
+
+SOURCES = {
+    "word":[char("天", "tiān"), char("气", "qì"), char("好", "hǎo"), char("人", "rén")],
+    "ci":[{"ci":w, "explanation":"释义 %s"%w} for w in ("天气", "好人", "天人")],
+    "idiom":[idiom("天人合一")],
+    "x7":{"天":[["天", ["名"], "tiān", ["❶天空"]]],
+          "天气":[["天气", ["名"], "tiānqì", ["❶气象"]]],
+          "气人":[["气人", ["形"], "qìrén", ["❶使人生气"]]],
+          "囧":[["囧", ["形"], "jiǒng", ["❶窘迫"]]]},
+    "xiehouyu":[],
+    }
+FREQ = [("天", 1), ("人", 2), ("好", 3), ("天气", 4), ("好人", 5), ("气人", 6), ("天人合一", 7),
+        ("好天", 8)]
+
+def writeSource(dict_dir, name, data):
+    fn = os.path.join(dict_dir, name)
+    with gzip.open(fn, "wt", encoding="utf-8") as fp:
+        json.dump(data, fp, ensure_ascii=False)
+    #a new mtime even within the timestamp granularity, so the fingerprint hashes it
+    st = os.stat(fn)
+    os.utime(fn, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+@pytest.fixture(name="dict_dir")
+def fixture_dict_dir(tmp_path, monkeypatch):
+    """ a small dicts/ and cache/ under tmp_path, which MultiChineseDict uses instead """
+    dict_dir = str(tmp_path/"dicts")
+    os.makedirs(os.path.join(dict_dir, "freq"))
+    for name, data in SOURCES.items():
+        writeSource(dict_dir, name, data)
+    with gzip.open(os.path.join(dict_dir, "freq", "freq"), "wt", encoding="utf-8") as fp:
+        for w, rank in FREQ:
+            fp.write("%s %d %d\n"%(w, 1000//rank, rank))
+
+    monkeypatch.setattr(MultiChineseDict, "DICT_DIR", dict_dir)
+    monkeypatch.setattr(MultiChineseDict, "SNAPSHOT_FILE", str(tmp_path/"cache"/"snapshot"))
+    monkeypatch.setattr(MultiChineseDict, "LAYER_DIR", str(tmp_path/"cache"/"layers"))
+    for attr, name in (("allFreq", "freq/freq"), ("x7ChWords", "x7"), ("jsWord", "word"),
+                       ("jsCi", "ci"), ("jsIdiom", "idiom"), ("jsXiehouyu", "xiehouyu")):
+        monkeypatch.setitem(MultiChineseDict.SOURCE_FILES, attr, os.path.join(dict_dir, name))
+    return dict_dir
+
+def dump(md):
+    """ everything build() made, in a comparable form """
+    entries = [x.asDict() for d in (md.allChars, md.allWords, md.allIdioms)
+               for dummy, x in sorted(d.items())]
+    return json.loads(json.dumps({
+        "entries":entries,
+        "headwords":[md.headwords.keys, list(md.headwords.freqs)],
+        "pinyin":[md.pinyin.find(p) for p in ("tian", "qi", "hao", "ren", "jiong")],
+        "chars":md.chars.find(),
+        }, ensure_ascii=False))
+
+def rebuilt(caplog):
+    """ dump of an incremental build and the phases it reused """
+    caplog.clear()
+    with caplog.at_level(logging.INFO):
+        md = Dict(incremental=True)
+    reused = [r.getMessage() for r in caplog.records if r.getMessage().startswith("reuse ")]
+    full = Dict(snapshot=False)
+    assert dump(md) == dump(full)
+    return reused[0].split(", rebuild ")[0] if reused else None
+
+CHANGES = [
+    #(source, nth change of it, the last phase a rebuild can reuse)
+    ("x7", lambda x7, n: x7["天气"][0][3].append("❷天色%d"%n), "buildChWordsFromFreqList"),
+    ("x7", lambda x7, n: x7.update({"好天%d"%n:[["好天", ["名"], "hǎotiān", ["❶晴天"]]]}),
+     "buildChWords"),
+    ("ci", lambda ci, n: ci.append({"ci":"人气%d"%n, "explanation":"释义"}), "buildChIdioms"),
+    ("idiom", lambda idioms, n: idioms.append(idiom("天气好人%d"%n)), "buildChChars"),
+    ]
+
+@pytest.mark.parametrize("source,change,last_reused", CHANGES,
+                         ids=["x7 text", "x7 headword", "ci", "idiom"])
+def test_incremental_build_equals_full_build(dict_dir, caplog, source, change, last_reused):
+    assert rebuilt(caplog) == "reuse nothing"
+    phases = [name for name, dummy, dummy in BUILD_LAYERS]
+    reusable = "reuse " + ", ".join(phases[:phases.index(last_reused) + 1])
+
+    data = json.loads(json.dumps(SOURCES[source]))
+    change(data, 1)
+    writeSource(dict_dir, source, data)
+    #only the state before attaching x7 explanations is checkpointed by the first build,
+    #the others once a change shows where rebuilds start
+    first = rebuilt(caplog)
+    if last_reused == "buildChWordsFromFreqList":
+        assert first == reusable
+    else:
+        assert first == "reuse nothing"
+
+    change(data, 2)
+    writeSource(dict_dir, source, data)
+    assert rebuilt(caplog) == reusable
@@ -14,6 +14,7 @@ import os
 import argparse
 import logging
 import TextLessonModel
+import DictClient
 
 logging.getLogger("jieba").setLevel(logging.ERROR)
 logging.basicConfig(format='[tlm_build.py: %(asctime)s %(levelname)s] %(message)s',
@@ -27,6 +28,10 @@ args = parser.parse_args()
 fn_yaml = args.yaml_file
 
 
+client = DictClient.connectDictServer()
+if client:
+    TextLessonModel.useDictServer(client)
+
 tlm = TextLessonModel.TextLessonModel(fn_yaml)
 
 print(tlm)
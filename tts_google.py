@@ -12,7 +12,7 @@ import sys
 import argparse
 import logging
 import Config
-from TTSService import GoogleTTS
+from TTSService import TTSService
 
 SCRIPT_PATH=os.path.dirname(os.path.realpath(__file__))
 
@@ -20,7 +20,7 @@ def cli(args, config):
     """ Command Line Interface entry """
     content = None
 
-    tts = GoogleTTS(config)
+    tts = TTSService(config)
 
     if args.input_file:
         logging.info('Processing Chinese input file: %s', args.input_file)